@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: memory held per Biosample, on top of its metadata content.
+
+Compares the previous layout (attributes, including a reference to the logger, stored in a per-instance `__dict__`)
+against the current one (attributes declared in `__slots__`, logger shared by the class).
+
+Samples are loaded the way they are retrieved from the archive (:func:`~Biosample.from_archive`), so the metadata
+content is allocated before measuring and only the cost of the entity objects themselves is measured. With 1M samples
+(Python 3.11): 104 bytes per entity before, 56 bytes after.
+
+Usage: python benchmarks/entity_memory.py [number of samples]
+"""
+import logging
+import sys
+import tracemalloc
+
+from biobroker.metadata_entity import Biosample
+
+
+class LegacySample:
+    """
+    Attribute layout of Biosample before `__slots__`: same attributes, in a per-instance `__dict__`, plus the logger.
+    """
+    def __init__(self, metadata_content: dict, logger: logging.Logger):
+        self.logger = logger
+        self._entity = metadata_content
+        self.delimiter = "||"
+        self._flattened = None
+
+
+def build_contents(number_of_samples: int) -> list[dict]:
+    return [{'name': f'sample_{index}',
+             'accession': f'SAMEA{index}',
+             'release': '2024-01-01T00:00:00Z',
+             'characteristics': {'organism': [{'text': 'Homo sapiens'}],
+                                 'size': [{'text': index, 'unit': 'cm'}]}} for index in range(number_of_samples)]
+
+
+def memory_per_entity(function, contents: list[dict]) -> float:
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    samples = [function(content) for content in contents]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (end - start - sys.getsizeof(samples)) / len(contents)
+
+
+def main(number_of_samples: int):
+    contents = build_contents(number_of_samples)
+    logger = Biosample.from_archive(contents[0]).logger  # Set up the class logger before measuring
+    legacy_memory = memory_per_entity(lambda content: LegacySample(content, logger), contents)
+    current_memory = memory_per_entity(Biosample.from_archive, contents)
+    print(f"{number_of_samples} samples, memory per entity (metadata content excluded)")
+    print(f"before: {legacy_memory:.1f} bytes  after: {current_memory:.1f} bytes  "
+          f"reduction: {legacy_memory / current_memory:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
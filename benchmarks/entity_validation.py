@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: per-entity cost of validating and serialising Biosamples.
+
+Compares the previous implementation (serialise the validated model to a JSON string and parse it back) against the
+current one (dump the validated model straight to a JSON-compatible dictionary).
+
+Usage: python benchmarks/entity_validation.py [number of samples]
+"""
+import json
+import sys
+import time
+
+from biobroker.generic.pydantic_model import BiosampleGeneralModel
+from biobroker.metadata_entity import Biosample
+
+
+def build_samples(number_of_samples: int) -> list[Biosample]:
+    return [Biosample({'name': f'sample_{index}',
+                       'release': '2024-01-01T00:00:00Z',
+                       'organism': 'Homo sapiens',
+                       'collected_at': 'noon',
+                       'size': index,
+                       'size||unit': 'cm',
+                       'tissue': 'liver',
+                       'tissue||ontologyTerms': 'http://purl.obolibrary.org/obo/UBERON_0002107'},
+                      data_model=BiosampleGeneralModel) for index in range(number_of_samples)]
+
+
+def legacy_validate(sample: Biosample):
+    sample.entity = json.loads(BiosampleGeneralModel(**sample.entity).model_dump_json(exclude_unset=True,
+                                                                                      by_alias=True))
+
+
+def legacy_to_json(sample: Biosample):
+    return json.loads(json.dumps(sample.entity, default=str))
+
+
+def time_per_entity(function, samples: list[Biosample]) -> float:
+    start = time.perf_counter()
+    for sample in samples:
+        function(sample)
+    return (time.perf_counter() - start) / len(samples) * 1e6
+
+
+def main(number_of_samples: int):
+    samples = build_samples(number_of_samples)
+    benchmarks = [('validate', legacy_validate, lambda sample: sample.validate(BiosampleGeneralModel)),
+                  ('to_json', legacy_to_json, lambda sample: sample.to_json())]
+    print(f"{number_of_samples} samples, time per entity")
+    for name, legacy, current in benchmarks:
+        legacy_time = time_per_entity(legacy, samples)
+        current_time = time_per_entity(current, samples)
+        print(f"{name:<10} before: {legacy_time:8.2f} µs  after: {current_time:8.2f} µs  "
+              f"speed-up: {legacy_time / current_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
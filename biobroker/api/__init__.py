@@ -14,6 +14,12 @@ methods can be added as necessary.
 
 - verbose: set to `True` if you want `INFO` and above-level logging events. If not set or set to False, only `WARNING`
   and above will be displayed
+- max_workers: maximum number of concurrent requests for the operations on multiple entities (e.g. retrieving a list
+  of accessions). Defaults to 1. Operations on multiple entities return a
+  :class:`~biobroker.generic.utilities.BatchResult`: a list that also reports the entities that failed.
+- cache (BsdApi): cache for the retrieved entities. Either in memory (:class:`~biobroker.api.cache.MemoryCache`, LRU
+  with optional TTL) or persistent (:class:`~biobroker.api.cache.SqliteCache`). Check `cache.stats` for hit/miss
+  statistics.
 
 **Environment variables**:
 
@@ -29,6 +35,8 @@ methods can be added as necessary.
 """
 
 from .api import GenericApi, BsdApi
+from .cache import GenericCache, MemoryCache, SqliteCache
+from .journal import SubmissionJournal
 
 # This lets Sphinx know you want to document package.module.Class as package.Class.
-__all__ = ['GenericApi', 'BsdApi']
\ No newline at end of file
+__all__ = ['GenericApi', 'BsdApi', 'GenericCache', 'MemoryCache', 'SqliteCache', 'SubmissionJournal']
\ No newline at end of file
@@ -1,20 +1,28 @@
+import copy
 import os
+import threading
 
 import requests
 
+from collections.abc import Generator, Iterable
+from contextlib import closing
+
 from os.path import join
 from requests.utils import requote_uri
 
-from progressbar import progressbar, AdaptiveETA, Percentage, FormatLabel, AnimatedMarker, Counter, ProgressBar
+from progressbar import AdaptiveETA, Percentage, FormatLabel, AnimatedMarker, Counter, ProgressBar
 
+from biobroker.api.cache import GenericCache
+from biobroker.api.journal import SubmissionJournal
 from biobroker.api.exceptions import CantBeUpdatedApiError, CantBeUpdatedLocalError, ChecklistValidationError, \
-    BiosamplesValidationError, BiosamplesNoErrorMessageError, StructuredDataError, StructuredDataSubmissionError
-from biobroker.metadata_entity import Biosample
+    BiosamplesValidationError, BiosamplesNoErrorMessageError, StructuredDataError, StructuredDataSubmissionError, \
+    CantBeRetrievedApiError, DuplicateJournalEntriesError
+from biobroker.metadata_entity import Biosample, BiosampleFrame
 from biobroker.metadata_entity import GenericEntity
 from biobroker.authenticator import GenericAuthenticator
 from biobroker.generic.exceptions import MandatoryFunctionNotSet
 from biobroker.generic.logger import set_up_logger
-from biobroker.generic.utilities import slice_list
+from biobroker.generic.utilities import slice_list, map_concurrently, BatchResult
 from biobroker.generic.pydantic_model import StructuredDataModel
 
 import pydantic_core
@@ -23,6 +31,19 @@ import pydantic_core
 ## TODO: BsdApi Build self url. Self points to general biosamples...
 
 
+def _progress_bar(label: str, max_value: int) -> ProgressBar:
+    """
+    Set up a progress bar for operations on multiple entities.
+
+    :param label: Label shown before the progress.
+    :param max_value: Total number of entities.
+    :return: ProgressBar instance. Can be called on an iterable to wrap it.
+    """
+    return ProgressBar(widgets=[FormatLabel(f'{label}: '), Percentage(), " (", Counter(), f"/{max_value}) ",
+                                AnimatedMarker(markers='🀱🀲🀳🀴🀵🀶🀷🀾🁅🁌🁓🁚🁡'), " ", AdaptiveETA()],
+                       max_value=max_value)
+
+
 class GenericApi:
     """
     Generic API class. This class defines the minimal functions and class properties needed for the rest of the API
@@ -31,10 +52,13 @@ class GenericApi:
     :param authenticator: Authenticator object. Requests are handled through the authenticator.
     :param base_uri: Base (root) uri of the API.
     :param verbose: Boolean indicating if the logger should be verbose.
+    :param max_workers: Maximum number of concurrent requests for the operations on multiple entities. Defaults to 1
+                        (One request at a time).
     """
-    def __init__(self, authenticator: GenericAuthenticator, base_uri: str, verbose: bool = True):
+    def __init__(self, authenticator: GenericAuthenticator, base_uri: str, verbose: bool = True, max_workers: int = 1):
         self.authenticator = authenticator
         self.base_uri = base_uri
+        self.max_workers = max_workers
         self.logger = set_up_logger(self, verbose)
 
     def submit(self, entities: list[GenericEntity], **kwargs: dict) -> list[GenericEntity]:
@@ -146,11 +170,19 @@ class BsdApi(GenericApi):
     :param authenticator: Subclass instance from the authenticator module. For BioSamples, it's recommended to use
                           the WebinAuthenticator.
     :param verbose: True if logger should be set to INFO. Default WARNING.
+    :param max_workers: Maximum number of concurrent requests when submitting, retrieving or updating multiple samples.
+                        Please make sure the authenticator's connection pool (`pool_maxsize`) is at least this big.
+    :param cache: Optional cache for retrieved samples, see :mod:`~biobroker.api.cache`. Samples are looked up in the
+                  cache before requesting them to BioSamples, and updating or submitting a sample invalidates its
+                  entry. Expired samples are revalidated with a conditional request ('If-None-Match'/
+                  'If-Modified-Since'), and reused if BioSamples answers '304 Not Modified'.
     """
-    def __init__(self, authenticator: GenericAuthenticator, verbose: bool = True):
+    def __init__(self, authenticator: GenericAuthenticator, verbose: bool = True, max_workers: int = 1,
+                 cache: GenericCache | None = None):
         environment = 'dev' if 'dev' == os.environ.get('API_ENVIRONMENT', '') else ''
         base_uri = "https://www.ebi.ac.uk/biosamples/samples".replace('www', f"www{environment}")
-        super().__init__(authenticator, base_uri, verbose)
+        super().__init__(authenticator, base_uri, verbose, max_workers)
+        self.cache = cache
         self.bulk_accession_endpoint = join(self.base_uri.replace("biosamples/", "biosamples/v2/"), 'bulk-accession')
         self.bulk_submit_endpoint = join(self.base_uri.replace("biosamples/", "biosamples/v2/"), 'bulk-submit')
         self.validate_endpoint = join(self.base_uri, 'validate')
@@ -170,11 +202,20 @@ class BsdApi(GenericApi):
         r = self.authenticator.post(submit_url, payload=entity.entity)
         if r.status_code > 300:
             self._submit_errors(r)
-        return Biosample(r.json())
+        submitted_entity = Biosample.from_archive(r.json())
+        self._invalidate_cache([submitted_entity.accession])
+        return submitted_entity
 
     def _submit_multiple(self, entities: list[Biosample], kwargs: dict) -> list[Biosample]:
         """
-        Submit a list of BioSample entities to biosamples, using the bulk-submit endpoint.
+        Submit a list of BioSample entities to biosamples, using the bulk-submit endpoint. Up to
+        :attr:`~BsdApi.max_workers` chunks are uploaded at the same time; the responses of the finished chunks are
+        parsed while the next ones are being uploaded.
+
+        If a chunk fails, no more chunks are sent: chunks waiting to be uploaded are cancelled, and the error is raised
+        once the chunks already being uploaded finish. Please note that, when submitting concurrently, those chunks may
+        come after the failing one; they are archived (And recorded in the journal, if any) but not returned. To be
+        able to resume a failed submission without duplicating samples, please provide a `journal`.
 
         :param entities: Iterable (List/Tuple) of BioSample objects. Must always be an iterable.
         :param kwargs: Keyword argument:
@@ -183,25 +224,86 @@ class BsdApi(GenericApi):
                          once. Due to BSD technical limitations, capped at 500.
                        - 'process_relationships': bool, if set to true, after submission, updates the samples with
                          the relationships.
+                       - 'journal': path to a journal file or :class:`~biobroker.api.journal.SubmissionJournal`.
+                         Each accepted chunk is recorded in the journal; samples already recorded are not submitted
+                         again, and their recorded result is returned instead. Samples with the same name and content
+                         can't be submitted with a journal
+                         (:exc:`~biobroker.api.exceptions.DuplicateJournalEntriesError`).
+
+        :return: a list of BioSample entities, in the same order as the input.
+        """
+        journal = kwargs.get('journal')
+        if isinstance(journal, (str, os.PathLike)):
+            with SubmissionJournal(journal) as journal:
+                return self._submit_multiple(entities, dict(kwargs, journal=journal))
+
+        if journal:
+            duplicates = journal.duplicates(entities)
+            if duplicates:
+                raise DuplicateJournalEntriesError(duplicates, self.logger)
+        journaled = journal.lookup(entities) if journal else {}
+        pending_entities = [entity for index, entity in enumerate(entities) if index not in journaled]
+        if journaled:
+            self.logger.info(f"{len(journaled)} samples found in the submission journal; they won't be submitted again")
 
-        :return: a list of BioSample entities
-        """
-        submission_results = []
         chunk_size = min(kwargs.get('chunk_size', 500), 500)
-        self.logger.info(f"Submitting {len(entities)} samples to bulk endpoint: {self.bulk_submit_endpoint}")
-        for entity_chunk in slice_list(entities, chunk_size):
-            r = self.authenticator.post(self.bulk_submit_endpoint,
-                                        payload=entity_chunk)
-            if r.status_code > 300:
-                self._submit_errors(r)
-            results = r.json()
-            submission_results.extend([Biosample(result) for result in results])
+        self.logger.info(f"Submitting {len(pending_entities)} samples to bulk endpoint: {self.bulk_submit_endpoint}")
+        submitted, errors = [], []
+        failed = threading.Event()
+
+        def entity_chunks():
+            # Stop scheduling new chunks once one has failed
+            for entity_chunk in slice_list(pending_entities, chunk_size):
+                if failed.is_set():
+                    return
+                yield entity_chunk
+
+        def submit_chunk(entity_chunk):
+            # Chunks already scheduled, but not started, are not sent once one has failed
+            if failed.is_set():
+                return None
+            try:
+                return self._submit_chunk(entity_chunk)
+            except Exception:
+                failed.set()
+                raise
+
+        for entity_chunk, results, error in map_concurrently(submit_chunk, entity_chunks(), self.max_workers):
+            if error:
+                errors.append(error)
+                continue
+            if results is None:
+                # Cancelled after a failure
+                continue
+            if journal:
+                journal.record(entity_chunk, results)
+            submitted.extend(results)
+        if errors:
+            raise errors[0]
+
+        submitted = iter(submitted)
+        submission_results = [Biosample.from_archive(journaled[index]) if index in journaled else next(submitted)
+                              for index in range(len(entities))]
 
         if kwargs.get('process_relationships'):
             self.logger.info("Processing sample relationships. This may take a while.")
             submission_results = self.process_relationships(entities=submission_results)
         return submission_results
 
+    def _submit_chunk(self, entity_chunk: list[Biosample]) -> list[Biosample]:
+        """
+        Submit a chunk of BioSample entities to the bulk-submit endpoint.
+
+        :param entity_chunk: List of BioSample entities. Due to BSD technical limitations, 500 samples at most.
+        :return: List of submitted BioSample entities.
+        """
+        r = self.authenticator.post(self.bulk_submit_endpoint, payload=entity_chunk)
+        if r.status_code > 300:
+            self._submit_errors(r)
+        submitted_entities = [Biosample.from_archive(result) for result in r.json()]
+        self._invalidate_cache(entity.accession for entity in submitted_entities)
+        return submitted_entities
+
     # Retrieve/update/delete functions
 
     def _retrieve(self, accession: str) -> Biosample:
@@ -211,24 +313,62 @@ class BsdApi(GenericApi):
         :param accession: Accession ID, in BioSamples format
         :return: Biosample entity retrieved from the BioSample database
         """
+        headers, stale_sample = {}, None
+        if self.cache is not None:
+            cached_sample = self.cache.get(accession)
+            if cached_sample is not None:
+                return Biosample.from_archive(cached_sample)
+            stale_sample = self.cache.get_stale(accession)
+            if stale_sample is not None:
+                headers = self._conditional_headers(stale_sample[1])
         self.logger.info(f"Trying to retrieve sample with accession {accession}")
-        return Biosample(self.authenticator.get(join(self.base_uri, accession)).json())
-
-    def _retrieve_multiple(self, accession_list: list[str]) -> list[Biosample]:
-        """
-        Retrieve multiple samples from BioSamples by providing a list of accessions.
+        response = self.authenticator.get(join(self.base_uri, accession), headers=headers)
+        if response.status_code == 304 and stale_sample is not None:
+            self.cache.refresh(accession)
+            return Biosample.from_archive(stale_sample[0])
+        if response.status_code != 200:
+            raise CantBeRetrievedApiError(accession=accession, response=response, logger=self.logger)
+        sample = Biosample.from_archive(response.json())
+        if self.cache is not None:
+            self.cache.set(accession, sample.entity, validators={'ETag': response.headers.get('ETag'),
+                                                                 'Last-Modified': response.headers.get('Last-Modified')})
+        return sample
+
+    def _retrieve_multiple(self, accession_list: list[str]) -> BatchResult:
+        """
+        Retrieve multiple samples from BioSamples by providing a list of accessions. Up to
+        :attr:`~BsdApi.max_workers` samples are retrieved at the same time. Repeated accessions are only retrieved
+        once, but each position gets its own Biosample (Modifying one of them does not modify the others).
+
+        A sample failing to be retrieved does not stop the rest from being retrieved: the errors are stored in the
+        `failures` attribute of the returned list, as {<position of the accession in the input>: <exception>}, the same
+        way as :func:`~BsdApi._update_multiple`. Failed samples are left out of the returned list.
 
         :param accession_list: Iterable (tuple|list) with accessions
-        :return: List of BioSample entities retrieved from BioSamples API
-        """
-        samples = [self._retrieve(accession) for accession in progressbar(accession_list,
-                                                                          widgets=[FormatLabel('Retrieving samples: '),
-                                                                                   Percentage(), " (", Counter(),
-                                                                                   f"/{len(accession_list)}) ",
-                                                                                   AnimatedMarker(markers='🀱🀲🀳🀴🀵🀶🀷🀾'
-                                                                                                          '🁅🁌🁓🁚🁡'),
-                                                                                   " ", AdaptiveETA()])]
-        return samples
+        :return: List of BioSample entities retrieved from BioSamples API, in the same order as the accessions.
+        """
+        unique_accessions = list(dict.fromkeys(accession_list))
+        outcomes = {}
+        progress_bar = _progress_bar('Retrieving samples', len(unique_accessions))
+        for accession, sample, error in progress_bar(map_concurrently(self._retrieve, unique_accessions,
+                                                                      self.max_workers)):
+            outcomes[accession] = (sample, error)
+        retrieved, failures = [], {}
+        returned = set()
+        for index, accession in enumerate(accession_list):
+            sample, error = outcomes[accession]
+            if error:
+                failures[index] = error
+            elif accession in returned:
+                # Repeated accession: a copy, so each position can be modified independently
+                retrieved.append(Biosample.from_archive(copy.deepcopy(sample.entity), delimiter=sample.delimiter))
+            else:
+                returned.add(accession)
+                retrieved.append(sample)
+        if failures:
+            self.logger.warning(f"{len(failures)} out of {len(accession_list)} samples could not be retrieved. "
+                                "Check the 'failures' attribute of the returned list for more information.")
+        return BatchResult(retrieved, failures)
 
     def _update(self, entity: Biosample) -> Biosample:
         """
@@ -244,24 +384,36 @@ class BsdApi(GenericApi):
             raise CantBeUpdatedLocalError(sample_id=entity.id, reasons=is_invalid, logger=self.logger)
         sample_url = os.path.join(self.base_uri, entity.accession)
         response = self.authenticator.put(url=sample_url, payload=entity.entity)
+        self._invalidate_cache([entity.accession])
         if response.status_code > 300:
             raise CantBeUpdatedApiError(sample_id=entity.id, response=response, logger=self.logger)
-        return Biosample(response.json())
+        return Biosample.from_archive(response.json())
 
-    def _update_multiple(self, entities: list[Biosample]) -> list[Biosample]:
+    def _update_multiple(self, entities: list[Biosample]) -> BatchResult:
         """
         Updates multiple samples in the BSD database. Since they can only be updated once at a time, calls
-        :func:`~Biosample._update` once per sample in list.
+        :func:`~Biosample._update` once per sample in list, with up to :attr:`~BsdApi.max_workers` updates at the same
+        time.
+
+        A sample failing to be updated does not stop the rest from being updated: the errors are stored in the
+        `failures` attribute of the returned list, as {<position of the sample in the input>: <exception>}. Samples
+        are keyed by position, since several failing samples can share an accession (or lack one).
 
         :param entities: List of Biosample entities to update
-        :return: List with updated Biosample entities
-        """
-        return [self._update(entity) for entity in progressbar(entities,
-                                                               widgets=[FormatLabel('Updating samples: '),
-                                                                        Percentage(), " (", Counter(),
-                                                                        f"/{len(entities)}) ",
-                                                                        AnimatedMarker(markers='🀱🀲🀳🀴🀵🀶🀷🀾🁅🁌🁓🁚🁡'), " ",
-                                                                        AdaptiveETA()])]
+        :return: List with updated Biosample entities, in the same order as the input.
+        """
+        updated, failures = [], {}
+        progress_bar = _progress_bar('Updating samples', len(entities))
+        outcomes = map_concurrently(self._update, entities, self.max_workers)
+        for index, (entity, updated_entity, error) in enumerate(progress_bar(outcomes)):
+            if error:
+                failures[index] = error
+            else:
+                updated.append(updated_entity)
+        if failures:
+            self.logger.warning(f"{len(failures)} out of {len(entities)} samples could not be updated. "
+                                "Check the 'failures' attribute of the returned list for more information.")
+        return BatchResult(updated, failures)
 
     # BioSamples-specific
 
@@ -302,43 +454,127 @@ class BsdApi(GenericApi):
         updated_entities = self.update(entities)
         return updated_entities
 
-    def search_samples(self, text: str = "", attributes=None) -> list[Biosample]:
+    def search_samples(self, text: str = "", attributes=None, prefetch: int = 0) -> list[Biosample]:
         """
         Search for samples in the Biosamples database. Can either search using free text (Can be improved using the
         query syntax specified here: https://www.ebi.ac.uk/ebisearch/documentation) or by attributes' values. For the
         attributes, please provide them as a dictionary.
 
+        All the results are loaded in memory, in a list; for broad searches, please use :func:`~BsdApi.iter_samples`,
+        which yields them page by page with bounded memory.
+
         :param text: free text for the search. Can use query syntax for search engines (AND/OR etc)
         :param attributes: Attributes to filter by. Has to be provided as a dictionary {<attribute_name>: <attr. value>}
+        :param prefetch: Number of pages of results to retrieve concurrently, ahead of the ones being processed. If 0
+                         (Default), pages are retrieved one at a time.
         :return: list of Biosamples or an empty list.
         """
+        samples = []
+        progress_bar = None
+        for page in self._search_pages(text, attributes, prefetch):
+            if not page.get('_embedded'):
+                break
+            if progress_bar is None:
+                progress_bar = _progress_bar('Retrieving samples', page['page']['totalElements'])
+            samples.extend(Biosample.from_archive(sample) for sample in page['_embedded']['samples'])
+            progress_bar.update(min(len(samples), progress_bar.max_value))
+        if progress_bar is not None:
+            progress_bar.finish()
+        return samples
+
+    def search_frame(self, text: str = "", attributes=None, prefetch: int = 0) -> BiosampleFrame:
+        """
+        Search for samples in the Biosamples database, returning the results as a columnar
+        :class:`~biobroker.metadata_entity.BiosampleFrame` instead of a list of Biosamples. Results are flattened as
+        each page is retrieved, without keeping a Biosample instance per result. See :func:`~BsdApi.search_samples`
+        for the search parameters.
+
+        The frame is lighter than a list of Biosamples, but all the results are still held in memory; for broad
+        searches, please use :func:`~BsdApi.iter_samples`.
+
+        :param text: free text for the search. Can use query syntax for search engines (AND/OR etc)
+        :param attributes: Attributes to filter by. Has to be provided as a dictionary {<attribute_name>: <attr. value>}
+        :param prefetch: Number of pages of results to retrieve concurrently, ahead of the ones being processed.
+        :return: BiosampleFrame, empty if no samples were found.
+        """
+        records = []
+        for page in self._search_pages(text, attributes, prefetch):
+            if not page.get('_embedded'):
+                break
+            records.extend(Biosample.from_archive(sample).flatten() for sample in page['_embedded']['samples'])
+        return BiosampleFrame.from_records(records)
+
+    def iter_samples(self, text: str = "", attributes=None, limit: int | None = None,
+                     prefetch: int = 0) -> Generator:
+        """
+        Lazily search for samples in the Biosamples database, yielding them as each page of results is retrieved. Only
+        one page of results (Plus the `prefetch` pages retrieved ahead) is held in memory at once, and no more pages are
+        requested once the generator is closed or the limit is reached. This is the bounded-memory alternative to
+        :func:`~BsdApi.search_samples` and :func:`~BsdApi.search_frame`, which hold all the results; see
+        :func:`~BsdApi.search_samples` for the search parameters.
+
+        :param text: free text for the search. Can use query syntax for search engines (AND/OR etc)
+        :param attributes: Attributes to filter by. Has to be provided as a dictionary {<attribute_name>: <attr. value>}
+        :param limit: Maximum number of samples to yield. If not set, yields all the search results.
+        :param prefetch: Number of pages of results to retrieve concurrently, ahead of the ones being yielded. If 0
+                         (Default), pages are retrieved one at a time.
+        :return: Generator of Biosamples.
+        """
+        if limit is not None and limit <= 0:
+            return
+        yielded = 0
+        with closing(self._search_pages(text, attributes, prefetch)) as pages:
+            for page in pages:
+                for sample in page.get('_embedded', {}).get('samples', []):
+                    yield Biosample.from_archive(sample)
+                    yielded += 1
+                    if yielded == limit:
+                        return
+
+    def _search_pages(self, text: str, attributes: dict | None, prefetch: int = 0) -> Generator:
+        """
+        Search for samples in the Biosamples database and yield the raw response of each page of results, in order.
+
+        By default, it follows the 'next' links one page at a time. If `prefetch` is set, the number of pages is
+        calculated from the first response, and up to `prefetch` pages are retrieved concurrently, ahead of the page
+        being yielded. Prefetched pages are requested by page number: if a page does not have the expected number (e.g.
+        the search is paginated with cursors past a certain depth), prefetching stops and the rest of the pages are
+        retrieved following the 'next' links from the last page yielded.
+
+        :param text: free text for the search.
+        :param attributes: Attributes to filter by, as a dictionary {<attribute_name>: <attr. value>}
+        :param prefetch: Number of pages to retrieve concurrently.
+        :return: Generator of responses (JSON) for each page.
+        """
         if attributes is None:
             attributes = dict()
-        search_query = self._build_search_query(text, attributes)
-        query_url = f"{self.base_uri}?{search_query}"
-
-        response = self.authenticator.get(query_url).json()
-        len_sample_search = response['page']['totalElements']
-        size = response['page']['size']
-        if not response.get('_embedded'):
-            return []
-        samples = response['_embedded']['samples']
-
-        progress_bar = ProgressBar(widgets=[FormatLabel('Retrieving samples: '),
-                                            Percentage(), " (", Counter(),
-                                            f"/{len_sample_search}) ",
-                                            AnimatedMarker(markers='🀱🀲🀳🀴🀵🀶🀷🀾🁅🁌🁓🁚🁡'), " ",
-                                            AdaptiveETA()], max_value=len_sample_search)
-
-        current = size
-        while response['_links'].get('next'):
-            response = self.authenticator.get(response['_links']['next']['href']).json()
-            samples.extend(response['_embedded']['samples'])
-            progress_bar.update(current)
-            current += size
-        progress_bar.finish()
-
-        return [Biosample(sample) for sample in samples]
+        next_url = f"{self.base_uri}?{self._build_search_query(text, attributes)}"
+        if prefetch > 0:
+            first_page = self.authenticator.get(next_url).json()
+            yield first_page
+            next_url = first_page['_links'].get('next', {}).get('href')
+            size = first_page['page']['size']
+            number_of_pages = -(-first_page['page']['totalElements'] // size) if size else 0
+            page_urls = (f"{self.base_uri}?{self._build_search_query(text, attributes, page=page, size=size)}"
+                         for page in range(1, number_of_pages))
+            with closing(map_concurrently(self.authenticator.get, page_urls, prefetch, background=True)) as pages:
+                for page_number, (_, response, error) in enumerate(pages, start=1):
+                    if error:
+                        raise error
+                    page = response.json()
+                    if page.get('page', {}).get('number') != page_number:
+                        self.logger.info(f"Search page {page_number} could not be retrieved by number. Following "
+                                         "the 'next' links instead.")
+                        break
+                    yield page
+                    next_url = page['_links'].get('next', {}).get('href')
+                else:
+                    return
+
+        while next_url:
+            response = self.authenticator.get(next_url).json()
+            yield response
+            next_url = response['_links'].get('next', {}).get('href')
 
     def submit_structured_data(self, structured_data: dict) -> list[Biosample]:
         """
@@ -353,6 +589,7 @@ class BsdApi(GenericApi):
         structured_data_put_uri = join(self.structured_data_endpoint, structured_data['accession'])
         response = self.authenticator.put(url=structured_data_put_uri, payload=structured_data)
         if response.status_code == 200:
+            self._invalidate_cache([structured_data['accession']])
             return self.retrieve([structured_data['accession']])
         raise StructuredDataSubmissionError(self.logger, response)
 
@@ -370,6 +607,18 @@ class BsdApi(GenericApi):
         except pydantic_core.ValidationError as pydantic_error:
             raise StructuredDataError(logger=self.logger, errors=pydantic_error.errors())
 
+    def _invalidate_cache(self, accessions: Iterable[str]):
+        """
+        Invalidate the cache entries of the samples, if a cache is set up.
+
+        :param accessions: Accessions of the samples that have been submitted or updated. Empty accessions are ignored.
+        """
+        if self.cache is None:
+            return
+        for accession in accessions:
+            if accession:
+                self.cache.invalidate(accession)
+
     def _submit_errors(self, response: requests.Response) -> None:
         """
         Submission errors and how they should be handled. Biosamples returns non-jsonable responses sometimes so this
@@ -394,19 +643,38 @@ class BsdApi(GenericApi):
         return None
 
     @staticmethod
-    def _build_search_query(text: str, attributes: dict) -> str:
+    def _build_search_query(text: str, attributes: dict, page: int = 0, size: int | None = None) -> str:
         """
-        Build the search query for BSD. Attributes need to be joined. Page=0 is specified to return pagination in the
-        BioSamples API (Non-documented behaviour)
+        Build the search query for BSD. Attributes need to be joined. Page is always specified (Defaults to 0) to return
+        pagination in the BioSamples API (Non-documented behaviour)
 
         :param text: Free text to search by.
         :param attributes: Dictionary of attributes and values to filter by.
+        :param page: Number of the page of results.
+        :param size: Number of results per page. If not set, BioSamples' default is used.
         :return:
         """
         attributes_str = "&".join([f"filter=attr:{key}:{value}" for key, value in attributes.items()])
-        query = f"text={text}&{attributes_str}&page=0"
+        query = f"text={text}&{attributes_str}&page={page}"
+        if size is not None:
+            query += f"&size={size}"
         return requote_uri(query)
 
+    @staticmethod
+    def _conditional_headers(validators: dict) -> dict:
+        """
+        Build the headers for a conditional request from the validators of a previous response.
+
+        :param validators: Dictionary with the 'ETag' and/or 'Last-Modified' of a previous response.
+        :return: Dictionary with the 'If-None-Match' and/or 'If-Modified-Since' headers.
+        """
+        headers = {}
+        if validators.get('ETag'):
+            headers['If-None-Match'] = validators['ETag']
+        if validators.get('Last-Modified'):
+            headers['If-Modified-Since'] = validators['Last-Modified']
+        return headers
+
     @staticmethod
     def _is_invalid_for_update(entity: Biosample) -> list[str] | bool:
         """
@@ -0,0 +1,252 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+from biobroker.generic.exceptions import MandatoryFunctionNotSet
+from biobroker.generic.logger import set_up_logger
+
+
+class GenericCache:
+    """
+    Generic cache for the entities retrieved from an archive, keyed by accession. Defines the functions expected by the
+    API objects; subclasses decide where the entries are stored. All the operations are thread-safe.
+
+    Entries are the metadata content of the entities (JSON-like dictionaries), not the entities themselves. They can be
+    stored with HTTP validators ('ETag' and/or 'Last-Modified' of the response); expired entries with validators are
+    kept, so they can be revalidated with a conditional request instead of being downloaded again.
+
+    :param ttl: Time to live of the entries, in seconds. Expired entries are treated as missing. If not set, entries
+                never expire. Set it to 0 to revalidate the entries on every retrieval.
+    :param verbose: Boolean indicating if the logger should be verbose.
+    """
+    def __init__(self, ttl: float | None = None, verbose: bool = False):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.logger = set_up_logger(self, verbose=verbose)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        """
+        Get an entry from the cache.
+
+        :param key: Accession of the entity.
+        :return: Content of the entity, or None if not cached or expired.
+        """
+        with self._lock:
+            entry = self._get(key)
+            if entry is not None and self._is_expired(entry[0]):
+                if not entry[2]:
+                    self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def get_stale(self, key: str) -> tuple[dict, dict] | None:
+        """
+        Get an expired entry that can be revalidated.
+
+        :param key: Accession of the entity.
+        :return: Tuple (<content of the entity>, <validators>) or None if there is no entry with validators.
+        """
+        with self._lock:
+            entry = self._get(key)
+            if entry is None or not entry[2]:
+                return None
+            return entry[1], entry[2]
+
+    def set(self, key: str, value: dict, validators: dict | None = None):
+        """
+        Store an entry in the cache, replacing any previous entry for the same key.
+
+        :param key: Accession of the entity.
+        :param value: Content of the entity.
+        :param validators: HTTP validators of the response, as {'ETag': <etag>, 'Last-Modified': <date>}. Validators
+                           with no value are ignored.
+        """
+        validators = {name: validator for name, validator in (validators or {}).items() if validator}
+        with self._lock:
+            self._set(key, time.time(), value, validators)
+
+    def refresh(self, key: str):
+        """
+        Mark an entry as revalidated (i.e. the archive answered '304 Not Modified'), resetting its time to live.
+
+        :param key: Accession of the entity.
+        """
+        with self._lock:
+            entry = self._get(key)
+            if entry is not None:
+                self._set(key, time.time(), entry[1], entry[2])
+                self.revalidations += 1
+
+    def invalidate(self, key: str):
+        """
+        Remove an entry from the cache, if present.
+
+        :param key: Accession of the entity.
+        """
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        """
+        Remove all the entries from the cache and reset the statistics.
+        """
+        with self._lock:
+            self._clear()
+            self.hits = 0
+            self.misses = 0
+            self.revalidations = 0
+
+    @property
+    def stats(self) -> dict:
+        """
+        Hit/miss statistics of the cache.
+
+        :return: Dictionary with the number of 'hits', 'misses', the 'hit_ratio', the number of 'revalidations' (misses
+                 answered with a '304 Not Modified') and the 'size' of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits / lookups if lookups else 0.0,
+                    'revalidations': self.revalidations, 'size': self._size()}
+
+    def _is_expired(self, stored_at: float) -> bool:
+        """
+        Check if an entry stored at `stored_at` has expired.
+
+        :param stored_at: Timestamp of storage of the entry.
+        :return: True if expired, False otherwise.
+        """
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _get(self, key: str) -> tuple[float, dict, dict] | None:
+        """
+        Must be overridden by subclasses. Return the entry (<timestamp>, <value>, <validators>) or None if not found.
+        """
+        raise MandatoryFunctionNotSet(self.logger)
+
+    def _set(self, key: str, stored_at: float, value: dict, validators: dict):
+        """
+        Must be overridden by subclasses. Store the entry.
+        """
+        raise MandatoryFunctionNotSet(self.logger)
+
+    def _delete(self, key: str):
+        """
+        Must be overridden by subclasses. Delete the entry, if present.
+        """
+        raise MandatoryFunctionNotSet(self.logger)
+
+    def _clear(self):
+        """
+        Must be overridden by subclasses. Delete all the entries.
+        """
+        raise MandatoryFunctionNotSet(self.logger)
+
+    def _size(self) -> int:
+        """
+        Must be overridden by subclasses. Return the number of entries stored.
+        """
+        raise MandatoryFunctionNotSet(self.logger)
+
+
+class MemoryCache(GenericCache):
+    """
+    In-memory cache. When full, the least recently used entry is evicted.
+
+    Entries are copied on the way in and out, so modifying a retrieved entity does not modify the cache.
+
+    :param max_size: Maximum number of entries.
+    :param ttl: Time to live of the entries, in seconds. If not set, entries never expire.
+    :param verbose: Boolean indicating if the logger should be verbose.
+    """
+    def __init__(self, max_size: int = 10000, ttl: float | None = None, verbose: bool = False):
+        super().__init__(ttl=ttl, verbose=verbose)
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def _get(self, key: str) -> tuple[float, dict, dict] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0], deepcopy(entry[1]), entry[2]
+
+    def _set(self, key: str, stored_at: float, value: dict, validators: dict):
+        self._entries[key] = (stored_at, deepcopy(value), validators)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def _clear(self):
+        self._entries.clear()
+
+    def _size(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCache(GenericCache):
+    """
+    Persistent cache, stored in an SQLite database (WAL mode). Entries survive between runs, so it can be shared between
+    jobs retrieving the same entities.
+
+    :param path: Path to the database file. Created if it does not exist.
+    :param ttl: Time to live of the entries, in seconds. If not set, entries never expire.
+    :param verbose: Boolean indicating if the logger should be verbose.
+    """
+    def __init__(self, path: str, ttl: float | None = None, verbose: bool = False):
+        super().__init__(ttl=ttl, verbose=verbose)
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS cached_entities ("
+                                "key TEXT PRIMARY KEY, "
+                                "stored_at REAL NOT NULL, "
+                                "value TEXT NOT NULL, "
+                                "validators TEXT NOT NULL DEFAULT '{}')")
+        columns = [column[1] for column in self.connection.execute("PRAGMA table_info(cached_entities)")]
+        if 'validators' not in columns:
+            # Caches created before validators were stored
+            self.connection.execute("ALTER TABLE cached_entities ADD COLUMN validators TEXT NOT NULL DEFAULT '{}'")
+        self.connection.commit()
+
+    def _get(self, key: str) -> tuple[float, dict, dict] | None:
+        row = self.connection.execute("SELECT stored_at, value, validators FROM cached_entities WHERE key = ?",
+                                      (key,)).fetchone()
+        return (row[0], json.loads(row[1]), json.loads(row[2])) if row else None
+
+    def _set(self, key: str, stored_at: float, value: dict, validators: dict):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO cached_entities (key, stored_at, value, validators) "
+                                    "VALUES (?, ?, ?, ?)",
+                                    (key, stored_at, json.dumps(value, default=str), json.dumps(validators)))
+
+    def _delete(self, key: str):
+        with self.connection:
+            self.connection.execute("DELETE FROM cached_entities WHERE key = ?", (key,))
+
+    def _clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM cached_entities")
+
+    def _size(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM cached_entities").fetchone()[0]
+
+    def close(self):
+        """
+        Close the connection to the database.
+        """
+        self.connection.close()
@@ -32,6 +32,21 @@ class AccessionHasIncorrectFormat(Exception):
         super().__init__(message)
 
 
+class CantBeRetrievedApiError(Exception):
+    def __init__(self, accession: str, response: Response, logger: logging.Logger):
+        """
+        Raise when an entity can't be retrieved from the API.
+
+        :param accession: Accession of the entity that could not be retrieved.
+        :param response: errored response (r.status_code != 200)
+        :param logger: subclasss logger to log the error message to.
+        """
+        self.message = (f"Sample with accession {accession} can't be retrieved:\n\t-Status code: {response.status_code}"
+                        f"\n\t-Response: {response.text}")
+        logger.error(self.message)
+        super().__init__(self.message)
+
+
 class CantBeUpdatedApiError(Exception):
     def __init__(self, sample_id, response: Response, logger: logging.Logger):
         """
@@ -134,4 +149,22 @@ class StructuredDataSubmissionError(Exception):
     def __init__(self, logger: logging.Logger, response: Response):
         self.message = f"Error submitting structured data: {response.text}"
         logger.error(self.message)
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+
+class DuplicateJournalEntriesError(Exception):
+    def __init__(self, duplicates: dict[str, list[int]], logger: logging.Logger):
+        """
+        Raise when a submission with a journal has several samples with the same name and content: the journal can't
+        tell them apart, so they would all be resumed with the same archived sample.
+
+        :param duplicates: Dictionary {<sample name>: [<positions of the samples in the input>]}
+        :param logger: subclasss logger to log the error message to.
+        """
+        self.duplicates = duplicates
+        duplicates_str = "\n\t- ".join(f"{name}: positions {', '.join(map(str, positions))}"
+                                       for name, positions in duplicates.items())
+        self.message = (f"Samples with the same name and content can't be submitted with a journal. Duplicated samples:"
+                        f"\n\t- {duplicates_str}")
+        logger.error(self.message)
+        super().__init__(self.message)
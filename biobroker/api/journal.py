@@ -0,0 +1,100 @@
+import hashlib
+import json
+import sqlite3
+
+from biobroker.metadata_entity import GenericEntity
+
+
+class SubmissionJournal:
+    """
+    On-disk journal for bulk submissions, backed by an SQLite database in WAL mode. Every chunk accepted by the archive
+    is recorded, keyed by the name and a hash of the content of each submitted entity, alongside the entity returned by
+    the archive (Accession included).
+
+    Entities are identified by name and content only, so a submission can't have several entities with the same name
+    and content (See :func:`~SubmissionJournal.duplicates`).
+
+    If a submission crashes or is interrupted, submitting the same entities again with the same journal skips the
+    entities already archived, returning the recorded results instead of re-submitting (or re-downloading) them.
+
+    :param path: Path to the journal file. Created if it does not exist.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS submitted_entities ("
+                                "name TEXT NOT NULL, "
+                                "content_hash TEXT NOT NULL, "
+                                "accession TEXT, "
+                                "chunk INTEGER NOT NULL, "
+                                "content TEXT NOT NULL, "
+                                "PRIMARY KEY (name, content_hash))")
+        self.connection.commit()
+
+    @staticmethod
+    def content_hash(entity: GenericEntity) -> str:
+        """
+        Hash the content of an entity. The same metadata always results in the same hash, regardless of key order.
+
+        :param entity: GenericEntity subclass
+        :return: hexadecimal SHA-256 hash of the entity content.
+        """
+        content = json.dumps(entity.entity, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def duplicates(self, entities: list[GenericEntity]) -> dict[str, list[int]]:
+        """
+        Find the entities with the same name and content. The journal can't tell them apart, so they can't be submitted
+        together with a journal.
+
+        :param entities: List of GenericEntity subclasses to be submitted.
+        :return: Dictionary {<name>: [<positions in entities>]} for the duplicated entities. Empty if there are none.
+        """
+        positions = {}
+        for index, entity in enumerate(entities):
+            positions.setdefault((entity.id, self.content_hash(entity)), []).append(index)
+        return {name: indexes for (name, _), indexes in positions.items() if len(indexes) > 1}
+
+    def lookup(self, entities: list[GenericEntity]) -> dict[int, dict]:
+        """
+        Look up entities that have already been submitted.
+
+        :param entities: List of GenericEntity subclasses to look up.
+        :return: Dictionary {<index in entities>: <content returned by the archive>} for the already submitted entities.
+        """
+        submitted = {}
+        for index, entity in enumerate(entities):
+            row = self.connection.execute("SELECT content FROM submitted_entities WHERE name = ? AND content_hash = ?",
+                                          (entity.id, self.content_hash(entity))).fetchone()
+            if row:
+                submitted[index] = json.loads(row[0])
+        return submitted
+
+    def record(self, entities: list[GenericEntity], submitted_entities: list[GenericEntity]):
+        """
+        Record an accepted chunk. Entities are recorded in a single transaction: either the whole chunk is recorded, or
+        none of it is.
+
+        :param entities: Entities as they were sent to the archive.
+        :param submitted_entities: Entities returned by the archive, in the same order.
+        """
+        with self.connection:
+            chunk = self.connection.execute("SELECT COALESCE(MAX(chunk), -1) + 1 FROM submitted_entities").fetchone()[0]
+            self.connection.executemany("INSERT OR REPLACE INTO submitted_entities VALUES (?, ?, ?, ?, ?)",
+                                        [(entity.id, self.content_hash(entity), submitted.accession, chunk,
+                                          json.dumps(submitted.entity, default=str))
+                                         for entity, submitted in zip(entities, submitted_entities)])
+
+    def close(self):
+        """
+        Close the connection to the journal.
+        """
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -15,6 +15,9 @@ extra check in case the token expires.
 
 - verbose: set to `True` if you want `INFO` and above-level logging events. If not set or set to False, only `WARNING`
   and above will be displayed
+- pool_connections, pool_maxsize, pool_block, max_retries: set-up of the connection pool. All the requests go through
+  a single, long-lived `requests.Session` that keeps the connections alive; it can be shared between threads. Call
+  `close()` (or use the authenticator as a context manager) to release the connections.
 
 **Environment variables**:
 
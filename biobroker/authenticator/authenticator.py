@@ -1,4 +1,6 @@
 import os
+import threading
+
 import requests
 
 from requests.adapters import HTTPAdapter
@@ -18,14 +20,24 @@ class GenericAuthenticator:
     :param username: Username required for authentication.
     :param password: Password required for authentication.
     :param verbose: Boolean indicating if the logger should be verbose.
+    :param pool_connections: Number of per-host connection pools to keep cached.
+    :param pool_maxsize: Maximum number of kept-alive connections per host. Set it to, at least, the number of threads
+                         sharing the authenticator; otherwise connections will be discarded and re-opened.
+    :param pool_block: If True, threads wait for a free connection when `pool_maxsize` is reached instead of opening
+                       (and discarding) extra connections.
+    :param max_retries: Number of times a failed request is retried, with exponential backoff.
     """
-    def __init__(self, base_uri: str, username: str, password: str, verbose: bool = False):
+    def __init__(self, base_uri: str, username: str, password: str, verbose: bool = False,
+                 pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False,
+                 max_retries: int = 5):
         self.base_uri = base_uri
 
         self.username = username
         self.password = password
         self.auth_endpoint = ""
         self.logger = set_up_logger(self, verbose=verbose)
+        self._token_lock = threading.Lock()
+        self.session = self._set_up_session(pool_connections, pool_maxsize, pool_block, max_retries)
 
     @property
     def auth_endpoint(self):
@@ -60,42 +72,85 @@ class GenericAuthenticator:
         """
         raise MandatoryFunctionNotSet(self.logger)
 
+    # Connection pool
+    @staticmethod
+    def _set_up_session(pool_connections: int, pool_maxsize: int, pool_block: bool,
+                        max_retries: int) -> requests.Session:
+        """
+        Set up the long-lived session shared by all the requests of the authenticator. Connections are kept alive and
+        re-used between requests, so the TCP/TLS handshake only happens once per pooled connection.
+
+        :param pool_connections: Number of per-host connection pools to keep cached.
+        :param pool_maxsize: Maximum number of kept-alive connections per host.
+        :param pool_block: Whether to block when no free connection is available in the pool.
+        :param max_retries: Number of retries for each request.
+        :return: requests.Session with the adapters mounted.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block,
+                              max_retries=Retry(total=max_retries, backoff_factor=1))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        """
+        Close the session and all the pooled connections. The authenticator can't be used after closing it.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _refresh_token(self, expired_token: str):
+        """
+        Refresh the token, unless another thread has already done it while this one was waiting for the lock.
+
+        :param expired_token: Token sent with the request that got rejected.
+        """
+        with self._token_lock:
+            if self.token == expired_token:
+                self.token = (self.username, self.password)
+
     # All functions below are wrappers for requests.get/put/patch/delete/post
-    def _request(self, url, method, payload: dict) -> requests.Response:
+    def _request(self, url, method, payload: dict, headers: dict | None = None) -> requests.Response:
         """
         Handle all requests. If token is expired, reload token and try again. If this results in another error, it will
         be risen.
 
+        Requests go through the pooled :attr:`~GenericAuthenticator.session`, which is safe to share between threads.
+
         :param url: URL to REQUEST
         :param method: Method for the REQUEST
         :param payload: Optional payload, for POST/PUT/PATCH methods
+        :param headers: Optional extra headers for the REQUEST (e.g. conditional headers, such as 'If-None-Match')
         :return:
         """
-        s = requests.Session()
-        retries = Retry(total=5, backoff_factor=1)
-        s.mount('https://', HTTPAdapter(max_retries=retries))
-
-        r = s.request(url=url, method=method, json=payload, headers={'Authorization': self.token,
-                                                                     'Content-Type': 'application/json'},
-                      )
+        token = self.token
+        r = self.session.request(url=url, method=method, json=payload,
+                                 headers={'Authorization': token, 'Content-Type': 'application/json', **(headers or {})})
 
         if r.status_code == 401:
             self.logger.warning(f"{method} request returned status code {r.status_code}. "
                                 "Refreshing token and trying again.")
-            self.token = (self.username, self.password)
-            r = s.request(url=url, method=method, json=payload, headers={'Authorization': self.token,
-                                                                         'Content-Type': 'application/json'},
-                          )
+            self._refresh_token(expired_token=token)
+            r = self.session.request(url=url, method=method, json=payload,
+                                     headers={'Authorization': self.token, 'Content-Type': 'application/json',
+                                              **(headers or {})})
         return r
 
-    def get(self, url: str) -> requests.Response:
+    def get(self, url: str, headers: dict | None = None) -> requests.Response:
         """
         GET a url
 
         :param url: URL to GET
+        :param headers: Optional extra headers (e.g. conditional headers, such as 'If-None-Match')
         :return: response
         """
-        return self._request(url, "GET", {})
+        return self._request(url, "GET", {}, headers)
 
     def post(self, url: str, payload: dict) -> requests.Response:
         """
@@ -143,12 +198,13 @@ class WebinAuthenticator(GenericAuthenticator):
 
     :param username: Webin username. Must start with "Webin-"
     :param password: Webin password.
+    :param kwargs: Connection pool arguments, see :class:`~GenericAuthenticator`.
     """
-    def __init__(self, username: str, password: str, verbose: bool = False):
+    def __init__(self, username: str, password: str, verbose: bool = False, **kwargs):
         environment = 'dev' if 'dev' == os.environ.get('API_ENVIRONMENT', '') else ''
         base_uri = "https://www.ebi.ac.uk/ena/submit/webin/auth".replace('www', f"www{environment}")
 
-        super().__init__(base_uri, username, password, verbose)
+        super().__init__(base_uri, username, password, verbose, **kwargs)
         self.validate_username(username)
         self.auth_endpoint = "token"
         self.token = ""
@@ -168,7 +224,7 @@ class WebinAuthenticator(GenericAuthenticator):
         :return:
         """
         self.logger.info(f"Generating token for user {self.username}")
-        r = requests.post(f"{self.auth_endpoint}", json={
+        r = self.session.post(f"{self.auth_endpoint}", json={
             "authRealms": [
                 "ENA"
             ],
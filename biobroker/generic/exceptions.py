@@ -1,5 +1,6 @@
 import inspect
 import logging
+from collections.abc import Iterable
 
 
 class MandatoryFunctionNotSet(Exception):
@@ -12,4 +13,21 @@ class MandatoryFunctionNotSet(Exception):
         message = f"Mandatory function '{caller_function}' not set in '{caller_class}'. Need to set up the following " \
                   f"parameters for the function: {', '.join(caller_function_parameters)}"
         logger.error(message)
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+
+class OptionalDependencyNotInstalled(Exception):
+    """Optional dependency needed for a functionality is not installed"""
+    def __init__(self, logger: logging.Logger, package: str, extra: str):
+        message = f"Package '{package}' is needed for this functionality, but it is not installed. Please install it " \
+                  f"with 'pip install biobroker[{extra}]'"
+        logger.error(message)
+        super().__init__(message)
+
+
+class CompressionNotSupported(Exception):
+    """Compression of a file is not supported"""
+    def __init__(self, logger: logging.Logger, compression: str, supported: Iterable[str]):
+        message = f"Compression '{compression}' is not supported. Supported compressions: {', '.join(supported)}"
+        logger.error(message)
+        super().__init__(message)
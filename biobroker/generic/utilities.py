@@ -1,4 +1,22 @@
-from typing import Generator
+import bz2
+import gzip
+import importlib
+import io
+import logging
+import os
+import sys
+from collections import deque
+from collections.abc import Callable, Generator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from types import ModuleType
+from typing import IO
+
+from biobroker.generic.exceptions import (
+    CompressionNotSupported,
+    OptionalDependencyNotInstalled,
+)
 
 
 def slice_list(list_to_chunk: list | tuple, chunk_size: int) -> Generator:
@@ -13,20 +31,205 @@ def slice_list(list_to_chunk: list | tuple, chunk_size: int) -> Generator:
     return (list_to_chunk[i:i+n] for i in range(0, len(list_to_chunk), n))
 
 
+def map_concurrently(function: Callable, items: Iterable, max_workers: int = 1, background: bool = False,
+                     captured_exceptions: tuple[type[Exception], ...] = (Exception,)) -> Generator:
+    """
+    Apply 'function' to every item using up to 'max_workers' threads, yielding the outcomes in the same order as the
+    input. Only a bounded window of calls is scheduled at once, so 'items' can be a generator of any length. Exceptions
+    in `captured_exceptions` are not raised, but yielded alongside the item, so the caller can decide what to do with
+    them. Closing the generator early cancels the calls that have not started yet.
+
+    :param function: Function taking a single item as argument.
+    :param items: Iterable with the items to process.
+    :param max_workers: Maximum number of threads. If 1 or lower, the items are processed in the calling thread (Unless
+                        `background` is set).
+    :param background: If True, the items are always processed in worker threads (At least one), so the calls overlap
+                       with the processing of the outcomes by the caller (e.g. to prefetch the next items).
+    :param captured_exceptions: Exceptions yielded instead of raised. Defaults to any exception (e.g. for batch
+                                operations that report the items that failed, whatever the reason).
+    :return: Generator of (item, result, exception) tuples. 'exception' is None if the call succeeded.
+    """
+    if background:
+        max_workers = max(1, max_workers)
+    elif max_workers <= 1:
+        for item in items:
+            try:
+                outcome = (item, function(item), None)
+            except captured_exceptions as error:
+                outcome = (item, None, error)
+            yield outcome
+        return
+
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque((item, executor.submit(function, item)) for item in islice(items, 2 * max_workers))
+    try:
+        while pending:
+            item, future = pending.popleft()
+            pending.extend((next_item, executor.submit(function, next_item)) for next_item in islice(items, 1))
+            try:
+                outcome = (item, future.result(), None)
+            except captured_exceptions as error:
+                outcome = (item, None, error)
+            yield outcome
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class BatchResult(list):
+    """
+    List with the results of a batch operation that, on top of the successful results, carries the errors of the items
+    that failed. Behaves as a normal list, so it can be used anywhere a list of results was expected.
+
+    :param results: Results of the items that succeeded, in input order.
+    :param failures: Dictionary {<item identifier>: <exception raised>} for the items that failed.
+    """
+    def __init__(self, results: Iterable = (), failures: dict | None = None):
+        super().__init__(results)
+        self.failures = failures if failures is not None else {}
+
+
+def import_optional_dependency(module_name: str, extra: str, logger: logging.Logger) -> ModuleType:
+    """
+    Import a module from an optional dependency, only when the functionality needing it is used.
+
+    :param module_name: Name of the module to import (e.g. 'pyarrow.parquet').
+    :param extra: Name of the package extra that installs the dependency (e.g. 'parquet').
+    :param logger: Logger to log the error with, if not installed.
+    :return: Imported module.
+    :raises OptionalDependencyNotInstalled: if the module can't be imported.
+    """
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        raise OptionalDependencyNotInstalled(logger, package=module_name.split('.')[0], extra=extra) from None
+
+
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.zst': 'zstd'}
+STANDARD_STREAM = '-'
+
+
+def is_stream(path_or_buffer: str | os.PathLike | IO) -> bool:
+    """
+    Check if the input/output of a processor is a stream (A file-like object, or '-' for stdin/stdout) instead of a
+    path to a file.
+
+    :param path_or_buffer: Path to the file, '-' or file-like object.
+    :return: True if it is a stream, False otherwise.
+    """
+    return not isinstance(path_or_buffer, (str, os.PathLike)) or path_or_buffer == STANDARD_STREAM
+
+
+def infer_compression(path_or_buffer: str | os.PathLike | IO) -> str | None:
+    """
+    Infer the compression of a file from the extension of its path. For file-like objects, the extension of their
+    `name` (if any) is used.
+
+    :param path_or_buffer: Path to the file, '-' or file-like object.
+    :return: 'gzip' ('.gz'), 'bz2' ('.bz2'), 'zstd' ('.zst') or None if not compressed.
+    """
+    path = path_or_buffer if not is_stream(path_or_buffer) else getattr(path_or_buffer, 'name', None)
+    if not isinstance(path, (str, os.PathLike)):
+        return None
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[1])
+
+
+@contextmanager
+def open_file(path_or_buffer: str | os.PathLike | IO, mode: str, logger: logging.Logger, encoding: str = 'utf-8',
+              compression: str | None = 'infer') -> Generator:
+    """
+    Open a file in text mode, transparently (de)compressing it. Compressed files are read and written as a stream,
+    without a decompressed copy on disk. To be used as a context manager.
+
+    Besides paths, it accepts '-' (stdin when reading, stdout when writing) and file-like objects. Binary streams are
+    (de)compressed and decoded; text streams are used as they are. Streams are never closed, only flushed.
+
+    Newlines are not translated, so the content is read and written as-is.
+
+    :param path_or_buffer: Path to the file, '-' or file-like object.
+    :param mode: 'r' to read, 'w' to write.
+    :param logger: Logger to log the error with, if the compression is not supported or the module needed for it is not
+                   installed.
+    :param encoding: Encoding of the text.
+    :param compression: 'gzip', 'bz2', 'zstd' or None. If 'infer' (Default), it is inferred from the extension of the
+                        path. See :func:`infer_compression`.
+    :return: File object, in text mode.
+    :raises CompressionNotSupported: if the compression is not supported.
+    :raises ValueError: if a compression is requested (Or inferred) for a text stream, which can't be (de)compressed.
+    """
+    if compression == 'infer':
+        compression = infer_compression(path_or_buffer)
+    if compression is not None and compression not in COMPRESSION_EXTENSIONS.values():
+        raise CompressionNotSupported(logger, compression, supported=sorted(set(COMPRESSION_EXTENSIONS.values())))
+    if isinstance(path_or_buffer, io.TextIOBase):
+        if compression is not None:
+            message = f"Text streams can't be {compression}-compressed. Please provide a binary stream instead."
+            logger.error(message)
+            raise ValueError(message)
+        yield path_or_buffer
+        path_or_buffer.flush()
+        return
+
+    with ExitStack() as stack:
+        if path_or_buffer == STANDARD_STREAM:
+            standard_stream = sys.stdin if mode == 'r' else sys.stdout
+            standard_stream.flush()
+            raw_file = standard_stream.buffer
+        elif is_stream(path_or_buffer):
+            raw_file = path_or_buffer
+        else:
+            # Only files opened here are closed on exit; streams are left open
+            raw_file = stack.enter_context(open(path_or_buffer, f"{mode}b"))
+        if mode == 'w':
+            stack.callback(raw_file.flush)
+        match compression:
+            case 'gzip':
+                binary_file = gzip.GzipFile(fileobj=raw_file, mode=f"{mode}b")
+            case 'bz2':
+                binary_file = bz2.BZ2File(raw_file, mode=f"{mode}b")
+            case 'zstd':
+                zstandard = import_optional_dependency('zstandard', extra='zstd', logger=logger)
+                binary_file = zstandard.open(raw_file, f"{mode}b", closefd=False)
+            case _:
+                binary_file = raw_file
+        text_file = io.TextIOWrapper(binary_file, encoding=encoding, newline='')
+        try:
+            yield text_file
+        finally:
+            # Detach instead of closing, so the streams passed as input are left open
+            text_file.flush()
+            text_file.detach()
+            if binary_file is not raw_file:
+                binary_file.close()
+
 def parse_pydantic_errors(pydantic_errors: list[dict]) -> list:
     messages = []
     for error in pydantic_errors:
-        location = "-->".join([str(e) for e in error['loc']]) if error['loc'] else "root"
-        user_input = error['input']
-        match error['type']:
-            case 'model_type':
-                message = "Value provided should be a dictionary"
-            case 'string_pattern_mismatch':
-                message = f"Value provided must match pattern {error['ctx']['pattern']}"
-            case 'missing':
-                message = f"Missing mandatory field '{error['loc'][-1]}'"
-                location = "-->".join([str(e) for e in error['loc']][:-1]) if len(error['loc']) > 1 else "root"
-            case _:
-                message = error['msg']
-        messages.append(f"{location}: {message}. Provided value: '{user_input}'")
-    return messages
\ No newline at end of file
+        location, message = parse_pydantic_error(error)
+        messages.append(f"{location}: {message}")
+    return messages
+
+
+def parse_pydantic_error(error: dict, skip_locations: int = 0) -> tuple[str, str]:
+    """
+    Parse a single pydantic error into a user-friendly location and message.
+
+    :param error: Pydantic error, as returned by `ValidationError.errors()`.
+    :param skip_locations: Number of leading elements of the location to ignore (e.g. the index of the entity when
+                           validating a list of entities).
+    :return: Tuple (<location>, <message>). Location is "root" if the error is on the whole entity.
+    """
+    error_location = error['loc'][skip_locations:]
+    location = "-->".join([str(e) for e in error_location]) if error_location else "root"
+    user_input = error['input']
+    match error['type']:
+        case 'model_type':
+            message = "Value provided should be a dictionary"
+        case 'string_pattern_mismatch':
+            message = f"Value provided must match pattern {error['ctx']['pattern']}"
+        case 'missing':
+            message = f"Missing mandatory field '{error_location[-1]}'"
+            location = "-->".join([str(e) for e in error_location][:-1]) if len(error_location) > 1 else "root"
+        case _:
+            message = error['msg']
+    return location, f"{message}. Provided value: '{user_input}'"
@@ -16,16 +16,31 @@ into all the different entities.
 
 - @input_data.setter
 
-**Aspects to improve**:
-
-- Currently, the :func:`~biobroker.input_processor.GenericInputProcessor.process`
-  function can fail at any point if any entity fails to validate. This could be handled in 2 ways:
-
-    - Catch all exceptions (meh) log them, and create the rest of the entities.
-    - `Current behaviour`: fail miserably and not return anything. I really like this option as, for me, an input
-      (spreadsheet, tsv file, etc) probably has meaning together and should remain this way. It could
-      be improved by logging all errors, then failing.
+**Processing**:
+
+- :func:`~biobroker.input_processor.GenericInputProcessor.process` can create the entities in parallel, in worker
+  processes (`max_workers`), in chunks of `chunk_size` rows. Entities are returned in the input order.
+- If any entity fails to validate, nothing is returned: an input (spreadsheet, tsv file, etc) probably has meaning
+  together and should remain this way. All the entities are processed first, though, so all the validation errors are
+  logged and raised together (:exc:`~biobroker.input_processor.exceptions.EntitiesValidationError`).
+- Large inputs can be streamed instead: :func:`~biobroker.input_processor.GenericInputProcessor.iter_records` and
+  :func:`~biobroker.input_processor.GenericInputProcessor.iter_entities` yield records/entities lazily. Subclasses
+  override `iter_records` to read the input in chunks (e.g. `TsvInputProcessor(path, chunk_size=10000)` or
+  `XlsxInputProcessor(path, read_only=True)`).
 """
 
-from .input_processor import GenericInputProcessor, TsvInputProcessor, XlsxInputProcessor
-__all__ = ['GenericInputProcessor', 'TsvInputProcessor', 'XlsxInputProcessor']
+from .input_processor import (
+    GenericInputProcessor,
+    JsonlInputProcessor,
+    ParquetInputProcessor,
+    TsvInputProcessor,
+    XlsxInputProcessor,
+)
+
+__all__ = [
+    'GenericInputProcessor',
+    'JsonlInputProcessor',
+    'ParquetInputProcessor',
+    'TsvInputProcessor',
+    'XlsxInputProcessor',
+]
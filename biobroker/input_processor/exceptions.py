@@ -1,3 +1,15 @@
 """
-Placeholder submodule for input processor-related exceptions.
-"""
\ No newline at end of file
+Input processor-related exceptions.
+"""
+import logging
+
+
+class EntitiesValidationError(Exception):
+    """One or more entities of the input data have failed validation"""
+    def __init__(self, logger: logging.Logger, errors: dict[int, str]):
+        self.errors = errors
+        delimiter = "\n\t- "
+        self.message = (f"{len(errors)} entities of the input data have failed validation:"
+                        f"{delimiter}{delimiter.join(f'Index {index}: {error}' for index, error in errors.items())}")
+        logger.error(self.message)
+        super().__init__(self.message)
@@ -1,12 +1,24 @@
-from copy import deepcopy
-from typing import Type
+import json
+from collections.abc import Generator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Type
 
-from pandas import read_csv, read_excel
-from numpy import nan
+from openpyxl import load_workbook
+from pandas import ArrowDtype, DataFrame, isna, read_csv, read_excel
+from pandas.api.types import is_scalar
+from pydantic import BaseModel
 
 from biobroker.generic.exceptions import MandatoryFunctionNotSet
 from biobroker.generic.logger import set_up_logger
+from biobroker.generic.utilities import (
+    import_optional_dependency,
+    open_file,
+    slice_list,
+)
+from biobroker.input_processor.exceptions import EntitiesValidationError
 from biobroker.metadata_entity import GenericEntity
+from biobroker.metadata_entity.exceptions import EntityValidationError
 
 """
 Test the behave tests
@@ -21,16 +33,29 @@ class GenericInputProcessor:
     """
     def __init__(self, input_data_path: str, verbose: bool = False):
         self._input_data = ''
+        self._dataframes = None
+        self._transformations = []
+        self._warned_fields = set()
         self.logger = set_up_logger(self, verbose=verbose)
         self.input_data = input_data_path
 
     @property
     def input_data(self) -> list[dict]:
         """
-        Input data in JSON format. Set from input_path by setter
+        Input data in JSON format. Set from input_path by setter. Subclasses can keep the input unmaterialised (As
+        dataframes, or not read at all when streaming) by setting it to None; it is then loaded in full from
+        :func:`~GenericInputProcessor.iter_records` on first access. Pending transformations (See
+        :func:`~GenericInputProcessor.transform`) are applied on access.
 
         :return: Input data in JSON format
         """
+        if self._input_data is None:
+            self._input_data = list(self.iter_records())
+            self._dataframes = None
+            self._transformations = []
+        elif self._transformations:
+            self._input_data = self._transform_records(self._input_data)
+            self._transformations = []
         return self._input_data
 
     @input_data.setter
@@ -38,11 +63,40 @@ class GenericInputProcessor:
         """
         SUBCLASSES MUST OVERRIDE THIS PROPERTY.
 
-        Must assign "self._input_data" input for the "process" function to use.
+        Must assign "self._input_data" input for the "process" function to use: either the records, or None. If None,
+        "self._dataframes" can be assigned a list of dataframes with the input; otherwise, the subclass must override
+        :func:`~GenericInputProcessor.iter_records` to read the input lazily.
         """
         raise MandatoryFunctionNotSet(self.logger)
 
-    def process(self, entity: Type[GenericEntity]) -> list[GenericEntity]:
+    def iter_records(self) -> Generator:
+        """
+        Iterate over the input data, one record (non-nested dictionary) at a time, with the pending transformations
+        applied. Subclasses supporting streaming override it to read the input lazily, without holding all the records
+        in memory.
+
+        :return: Generator of records.
+        """
+        if self._input_data is None and self._dataframes is not None:
+            for dataframe in self._dataframes:
+                yield from _to_records(self._apply_transformations(dataframe))
+            return
+        yield from self.input_data
+
+    def iter_entities(self, entity: type[GenericEntity]) -> Generator:
+        """
+        Lazily create the metadata entities, one record at a time (See :func:`~GenericInputProcessor.iter_records`).
+        Entities can be used (e.g. submitted) before the whole input has been read. Contrary to
+        :func:`~GenericInputProcessor.process`, an entity failing validation raises as soon as it is reached.
+
+        :param entity: GenericEntity subclass (Not instance) to process the input data into.
+        :return: Generator of entities.
+        """
+        entity.clear_load_cache()
+        for json_entity in self.iter_records():
+            yield entity(metadata_content=json_entity)
+
+    def process(self, entity: Type[GenericEntity], max_workers: int = 1, chunk_size: int = 1000) -> list[GenericEntity]:
         """
         Process self.input_data and return a list of metadata entities that depend on the 'GenericEntity' subclass
         passed to the function.
@@ -50,77 +104,497 @@ class GenericInputProcessor:
         Any field with value "None" should be processed by the entity type; different services may require different
         behaviours.
 
+        Entities are created in chunks of `chunk_size` rows. With `max_workers` > 1, chunks are processed in parallel,
+        in worker processes; entities are returned in the same order as the input data regardless. All the entities
+        are processed before failing: if any of them fails validation, all the errors are raised together.
+
         :param entity: GenericEntity subclass (Not instance) to process the input data into.
+        :param max_workers: Number of processes to use. Defaults to 1 (Processed in the current process).
+        :param chunk_size: Number of rows processed at once by each process.
         :return: list of entities. Must be subclass of GenericEntity
+        :raises EntitiesValidationError: if any of the entities fails validation.
         """
+        entity.clear_load_cache()
+        chunk_size = max(1, chunk_size)
+        chunks = list(slice_list(self.input_data, chunk_size))
+        if max_workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                results = list(executor.map(_process_chunk, [entity] * len(chunks), chunks))
+        else:
+            results = [_process_chunk(entity, chunk) for chunk in chunks]
+
         entities = []
-        for json_entity in self.input_data:
-            new_entity = entity(metadata_content=deepcopy(json_entity))
-            entities.append(new_entity)
+        errors = {}
+        for chunk_number, (chunk_entities, chunk_errors) in enumerate(results):
+            entities.extend(chunk_entities)
+            errors.update({chunk_number * chunk_size + index: error for index, error in chunk_errors.items()})
+        if errors:
+            raise EntitiesValidationError(self.logger, errors)
         return entities
 
-    def transform(self, field_mapping: dict, delete_non_mapped_fields: bool = False):
+    def transform(self, field_mapping: dict | None = None, delete_non_mapped_fields: bool = False,
+                  drop_fields: list[str] | None = None, fill_values: dict | None = None,
+                  value_mapping: dict[str, dict] | None = None):
         """
-        Transform the input data retrieved from the source to have new keys based on an {<old_key>: <new_key>} map. Only
-        simple key name change operations are allowed.
+        Transform the input data retrieved from the source. Operations are applied to whole fields (columns) at once,
+        in this order:
+
+        - Rename the fields based on an {<old_key>: <new_key>} map (`field_mapping`). If `delete_non_mapped_fields`,
+          only the renamed fields are kept.
+        - Drop the fields in `drop_fields`.
+        - Fill the missing values of fields with a constant, based on a {<key>: <value>} map (`fill_values`). Fields not
+          present in the input data are created.
+        - Replace values of fields, based on a {<key>: {<old_value>: <new_value>}} map (`value_mapping`).
+
+        Transformations are not applied straight away: they are chained and applied together, in a single pass, when
+        the input data is accessed (Before the records are created from the input, if not created yet), or to each
+        chunk of the input when streaming. Fields that are not found are warned about once per field.
 
         :param field_mapping: {'old_key': 'new_key'} dictionary. Not nested.
         :param delete_non_mapped_fields: Boolean to indicate if fields not present in the map above should be deleted.
                Defaults False
+        :param drop_fields: list of fields to delete.
+        :param fill_values: {'key': 'value'} dictionary with the value to fill the missing values of each field with.
+        :param value_mapping: {'key': {'old_value': 'new_value'}} dictionary with the values to replace in each field.
+        """
+        self._transformations.append({'field_mapping': field_mapping or {},
+                                      'delete_non_mapped_fields': delete_non_mapped_fields,
+                                      'drop_fields': drop_fields or [],
+                                      'fill_values': fill_values or {},
+                                      'value_mapping': value_mapping or {}})
+
+    def _apply_transformations(self, dataframe: DataFrame) -> DataFrame:
         """
-        for i, entity in enumerate(self.input_data):
-            for key, value in field_mapping.items():
-                try:
-                    field_value = entity.pop(key)
-                except KeyError:
-                    self.logger.warning(f"'transform' function: Key {key} was not found in entity with index {i}. "
-                                        "This entity will not be updated")
-                    break
-                entity[value] = field_value
-            if delete_non_mapped_fields:
-                [entity.pop(key) for key in entity.keys() if key not in field_mapping.keys()]
+        Apply the pending transformations to a dataframe with (part of) the input data. See
+        :func:`~GenericInputProcessor.transform`.
+
+        :param dataframe: Dataframe with the input data.
+        :return: transformed dataframe.
+        """
+        for transformation in self._transformations:
+            field_mapping = transformation['field_mapping']
+            if field_mapping:
+                self._warn_missing_fields(dataframe, field_mapping, "renamed")
+                dataframe = dataframe.rename(columns=field_mapping)
+                if transformation['delete_non_mapped_fields']:
+                    mapped_fields = set(field_mapping.values())
+                    dataframe = dataframe[[field for field in dataframe.columns if field in mapped_fields]]
+            if transformation['drop_fields']:
+                self._warn_missing_fields(dataframe, transformation['drop_fields'], "deleted")
+                dataframe = dataframe.drop(columns=transformation['drop_fields'], errors='ignore')
+            fill_values = transformation['fill_values']
+            dataframe = dataframe.assign(**{field: dataframe[field].fillna(value) if field in dataframe.columns
+                                            else value for field, value in fill_values.items()})
+            self._warn_missing_fields(dataframe, transformation['value_mapping'], "updated")
+            dataframe = dataframe.assign(**{field: dataframe[field].replace(mapping)
+                                            for field, mapping in transformation['value_mapping'].items()
+                                            if field in dataframe.columns})
+        return dataframe
+
+    def _transform_records(self, records: list[dict]) -> list[dict]:
+        """
+        Apply the pending transformations to records (non-nested dictionaries), through a dataframe.
+
+        :param records: list of records.
+        :return: list of transformed records.
+        """
+        if not self._transformations:
+            return records
+        return _to_records(self._apply_transformations(DataFrame(records, dtype=object)))
+
+    def _warn_missing_fields(self, dataframe: DataFrame, fields, operation: str):
+        """
+        Warn about the fields of a transformation not found in the input data, once per field.
+
+        :param dataframe: Dataframe with the input data.
+        :param fields: Fields used by the transformation.
+        :param operation: What the transformation does to the fields, for the message.
+        """
+        for field in fields:
+            if field not in dataframe.columns and (field, operation) not in self._warned_fields:
+                self._warned_fields.add((field, operation))
+                self.logger.warning(f"'transform' function: Field '{field}' was not found in the input data. It will "
+                                    f"not be {operation}")
+
+
+def _process_chunk(entity: type[GenericEntity],
+                   json_entities: list[dict]) -> tuple[list[GenericEntity], dict[int, str]]:
+    """
+    Create the entities for a chunk of the input data. Module-level so it can be sent to worker processes.
+
+    :param entity: GenericEntity subclass (Not instance) to process the input data into.
+    :param json_entities: Chunk of the input data.
+    :return: Tuple (<valid entities>, <errors as {<index in the chunk>: <error message>}>).
+    """
+    entities = []
+    errors = {}
+    for index, json_entity in enumerate(json_entities):
+        try:
+            entities.append(entity(metadata_content=json_entity))
+        except EntityValidationError as validation_error:
+            errors[index] = validation_error.message
+    return entities, errors
+
+
+def _to_records(dataframe: DataFrame) -> list[dict]:
+    """
+    Turn a dataframe read from the input into records (non-nested dictionaries), with missing values set to None.
+
+    :param dataframe: Dataframe read from the input file.
+    :return: list of records.
+    """
+    return dataframe.astype(object).where(dataframe.notna(), None).to_dict(orient='records')
 
 
 class TsvInputProcessor(GenericInputProcessor):
     """
     TSV input processor. Loads a TSV file with entity metadata.
 
-    :param input_data: Path to the file with the input metadata
-    :param field_mapping: Path to the file with the field mapping
+    If a `chunk_size` is provided, the file is streamed instead: it is read `chunk_size` rows at a time by
+    :func:`~GenericInputProcessor.iter_records` and :func:`~GenericInputProcessor.iter_entities`, keeping memory flat
+    regardless of the size of the file. The whole file is only loaded if :attr:`~GenericInputProcessor.input_data` is
+    accessed (e.g. by :func:`~GenericInputProcessor.process`).
+
+    Compressed files ('.tsv.gz', '.tsv.bz2', '.tsv.zst') are decompressed on the fly. Instead of a path, the input can
+    be '-' (stdin) or a file-like object; since streams can only be read once, please only iterate over them once.
+
+    :param input_data: Path to the file with the input metadata, '-' or file-like object.
+    :param chunk_size: Number of rows to read at a time. If not set (Default), the whole file is loaded on creation.
+    :param encoding: Encoding of the file. Defaults to 'cp437'.
+    :param compression: 'gzip', 'bz2', 'zstd' or None. Inferred from the extension of the path by default.
     """
-    def __init__(self, input_data):
+    def __init__(self, input_data, chunk_size: int | None = None, encoding: str = 'cp437',
+                 compression: str | None = 'infer'):
+        self.path = None
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.compression = compression
         super().__init__(input_data)
 
     @GenericInputProcessor.input_data.setter
-    def input_data(self, path: str):
+    def input_data(self, path: str | IO):
         """
         Setter for input_data property. Reads a TSV file with the pandas library, and returns a list with JSON files.
+        When streaming, the file is not read until needed.
 
-        :param path: Path to input data
+        :param path: Path to input data, '-' or file-like object.
+        """
+        self.path = path
+        self._input_data = None
+        self._dataframes = None
+        if not self.chunk_size:
+            with self._open() as tsv_file:
+                self._dataframes = [read_csv(tsv_file, sep="\t")]
+
+    def iter_records(self) -> Generator:
+        """
+        Iterate over the records of the TSV file. When streaming, the file is read `chunk_size` rows at a time.
+
+        :return: Generator of records.
+        """
+        if self._input_data is not None or self._dataframes is not None:
+            yield from super().iter_records()
+            return
+        with self._open() as tsv_file, read_csv(tsv_file, sep="\t", chunksize=self.chunk_size) as chunks:
+            for chunk in chunks:
+                yield from _to_records(self._apply_transformations(chunk))
+
+    def _open(self):
+        """
+        Open the input for reading, decompressing and decoding it. See :func:`~biobroker.generic.utilities.open_file`.
+
+        :return: Context manager with the file object, in text mode.
         """
-        file = read_csv(path, sep="\t", encoding='cp437').fillna(nan).replace([nan], [None])
-        json_file = file.to_dict(orient='records')
-        self._input_data = json_file
+        return open_file(self.path, 'r', logger=self.logger, encoding=self.encoding, compression=self.compression)
 
 
 class XlsxInputProcessor(GenericInputProcessor):
     """
     XLSX input processor. Loads a XLSX file with entity metadata.
 
+    If `read_only` is set, the workbook is streamed instead: rows are read lazily by
+    :func:`~GenericInputProcessor.iter_records` and :func:`~GenericInputProcessor.iter_entities`, using the openpyxl
+    read-only row iterator, without loading the whole workbook. In this mode, the first row of each worksheet is the
+    header and fully empty rows are skipped; records are the same as when the workbook is loaded. The whole input is
+    only loaded if :attr:`~GenericInputProcessor.input_data` is accessed (e.g. by
+    :func:`~GenericInputProcessor.process`).
+
     :param input_data: Path to the file with the input metadata.
-    :param worksheet_name: Name of the worksheet to be processed.
+    :param sheet_name: Name of the worksheet to be processed, or list of names. Records from several worksheets are
+                       returned one worksheet after the other, in order.
+    :param read_only: Boolean indicating if the workbook should be streamed. Defaults to False.
+    :param max_workers: Number of processes used to read several worksheets in parallel, in read-only mode. Each
+                        worksheet is read by one process. Defaults to 1 (Worksheets read one by one, lazily).
     """
-    def __init__(self, input_data: str, sheet_name: str = "Sheet1"):
+    TRANSFORMATION_CHUNK_SIZE = 1000
+
+    def __init__(self, input_data: str, sheet_name: str | list[str] = "Sheet1", read_only: bool = False,
+                 max_workers: int = 1):
+        self.path = None
         self.sheet_name = sheet_name
+        self.read_only = read_only
+        self.max_workers = max_workers
         super().__init__(input_data)
 
+    @property
+    def sheet_names(self) -> list[str]:
+        """
+        Names of the worksheets to be processed.
+
+        :return: list of worksheet names.
+        """
+        return [self.sheet_name] if isinstance(self.sheet_name, str) else list(self.sheet_name)
+
     @GenericInputProcessor.input_data.setter
     def input_data(self, path):
         """
-        Setter for the input_data property. Reads an xlsx file, on a specific worksheet name.
+        Setter for the input_data property. Reads an xlsx file, on a specific worksheet name. In read-only mode, the
+        file is not read until needed.
 
         :param path: Path to the file with the input metadata.
         """
-        file = read_excel(path, engine='openpyxl', sheet_name=self.sheet_name).fillna(nan).replace([nan], [None])
-        json_file = file.to_dict(orient='records')
-        self._input_data = json_file
\ No newline at end of file
+        self.path = path
+        self._input_data = None
+        if not self.read_only:
+            worksheets = read_excel(path, engine='openpyxl', sheet_name=self.sheet_names)
+            self._dataframes = [worksheets[sheet_name] for sheet_name in self.sheet_names]
+
+    def iter_records(self) -> Generator:
+        """
+        Iterate over the records of the worksheets. In read-only mode, rows are read lazily (Or, with `max_workers` > 1
+        and several worksheets, one worksheet per process).
+
+        :return: Generator of records.
+        """
+        if self._input_data is not None or self._dataframes is not None:
+            yield from super().iter_records()
+            return
+        if self.max_workers > 1 and len(self.sheet_names) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(self.sheet_names))) as executor:
+                for records in executor.map(_read_worksheet, [self.path] * len(self.sheet_names), self.sheet_names):
+                    yield from self._transform_records(records)
+            return
+        for sheet_name in self.sheet_names:
+            rows = _iter_worksheet(self.path, sheet_name)
+            if not self._transformations:
+                yield from rows
+                continue
+            # Transformations are applied to whole fields, so rows are transformed in chunks
+            while records := list(islice(rows, self.TRANSFORMATION_CHUNK_SIZE)):
+                yield from self._transform_records(records)
+
+
+def _iter_worksheet(path: str, sheet_name: str, chunk_size: int = 1000) -> Generator:
+    """
+    Lazily read the rows of a worksheet with the openpyxl read-only iterator. The first row is the header; fully empty
+    rows are skipped. Empty header cells are named as pandas does ('Unnamed: <column position>'), and rows are
+    converted through a dataframe, `chunk_size` rows at a time, so values have the same types as when the workbook is
+    not streamed (e.g. pandas Timestamps for dates).
+
+    :param path: Path to the xlsx file.
+    :param sheet_name: Name of the worksheet.
+    :param chunk_size: Number of rows converted at once.
+    :return: Generator of records.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = [f"Unnamed: {position}" if name is None else name for position, name in enumerate(next(rows, ()))]
+        rows = (row for row in rows if any(value is not None for value in row))
+        while chunk := list(islice(rows, chunk_size)):
+            yield from _to_records(DataFrame.from_records(chunk, columns=header))
+    finally:
+        workbook.close()
+
+
+def _read_worksheet(path: str, sheet_name: str) -> list[dict]:
+    """
+    Read all the records of a worksheet. Module-level so it can be sent to worker processes.
+
+    :param path: Path to the xlsx file.
+    :param sheet_name: Name of the worksheet.
+    :return: list of records.
+    """
+    return list(_iter_worksheet(path, sheet_name))
+
+
+class ParquetInputProcessor(GenericInputProcessor):
+    """
+    Parquet input processor. Loads a parquet file with entity metadata (e.g. as saved by
+    :class:`~biobroker.output_processor.ParquetOutputProcessor`). Requires the optional dependency 'pyarrow'
+    (`pip install biobroker[parquet]`).
+
+    Only the `columns` requested are read from the file. If a `chunk_size` is provided, the file is streamed instead: it
+    is read in batches of `chunk_size` rows by :func:`~GenericInputProcessor.iter_records` and
+    :func:`~GenericInputProcessor.iter_entities`. The whole file is only loaded if
+    :attr:`~GenericInputProcessor.input_data` is accessed (e.g. by :func:`~GenericInputProcessor.process`).
+
+    :param input_data: Path to the file with the input metadata.
+    :param columns: Names of the columns to read. If not set (Default), all the columns are read.
+    :param chunk_size: Number of rows to read at a time. If not set (Default), the whole file is loaded on creation.
+    """
+    def __init__(self, input_data: str, columns: list[str] | None = None, chunk_size: int | None = None):
+        self.path = None
+        self.columns = columns
+        self.chunk_size = chunk_size
+        super().__init__(input_data)
+
+    @GenericInputProcessor.input_data.setter
+    def input_data(self, path: str):
+        """
+        Setter for input_data property. Reads a parquet file with pyarrow, and returns a list with JSON files. When
+        streaming, the file is not read until needed.
+
+        :param path: Path to input data
+        """
+        self.parquet = import_optional_dependency('pyarrow.parquet', extra='parquet', logger=self.logger)
+        self.path = path
+        self._input_data = None
+        if self.chunk_size:
+            self._dataframes = None
+        else:
+            self._dataframes = [self._to_dataframe(self.parquet.read_table(path, columns=self.columns))]
+
+    def iter_records(self) -> Generator:
+        """
+        Iterate over the records of the parquet file. When streaming, the file is read `chunk_size` rows at a time.
+
+        :return: Generator of records.
+        """
+        if self._input_data is not None or self._dataframes is not None:
+            yield from super().iter_records()
+            return
+        parquet_file = self.parquet.ParquetFile(self.path)
+        try:
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_size, columns=self.columns):
+                if self._transformations:
+                    yield from _to_records(self._apply_transformations(self._to_dataframe(batch)))
+                else:
+                    yield from batch.to_pylist()
+        finally:
+            parquet_file.close()
+
+    @staticmethod
+    def _to_dataframe(table) -> DataFrame:
+        """
+        Turn a pyarrow table (or record batch) into a dataframe, keeping the arrow types: integers stay integers even
+        with missing values.
+
+        :param table: pyarrow Table or RecordBatch.
+        :return: Dataframe
+        """
+        return table.to_pandas(types_mapper=ArrowDtype)
+
+
+class JsonlInputProcessor(GenericInputProcessor):
+    """
+    JSON Lines input processor. Loads entities saved in their native (nested) format, one per line (e.g. as saved by
+    :class:`~biobroker.output_processor.JsonlOutputProcessor`). The file is always streamed: lines are read lazily by
+    :func:`~GenericInputProcessor.iter_records` and :func:`~JsonlInputProcessor.iter_entities`, and the whole file is
+    only loaded if :attr:`~GenericInputProcessor.input_data` is accessed.
+
+    Records are the content of the entities, not flattened: entities are created with the trusted constructor
+    (:func:`~biobroker.metadata_entity.GenericEntity.from_archive`), without replaying the creation field by field.
+    They are not validated unless a `data_model` is passed to :func:`~JsonlInputProcessor.iter_entities` or
+    :func:`~JsonlInputProcessor.process`; please validate files that do not come from valid entities before submitting.
+    Transformations (See :func:`~GenericInputProcessor.transform`) are applied to the top-level fields of the entities
+    (e.g. 'name', 'characteristics').
+
+    The file is decompressed on the fly if the path ends with '.gz' (gzip), '.bz2' (bz2) or '.zst' (zstd, requires the
+    optional dependency 'zstandard': `pip install biobroker[zstd]`). Instead of a path, the input can be '-' (stdin) or
+    a file-like object; since streams can only be read once, please only iterate over them once.
+
+    :param input_data: Path to the file with the input metadata, '-' or file-like object.
+    :param compression: 'gzip', 'bz2', 'zstd' or None. Inferred from the extension of the path by default.
+    :param encoding: Encoding of the file. Defaults to 'utf-8'.
+    """
+    TRANSFORMATION_CHUNK_SIZE = 1000
+
+    def __init__(self, input_data: str | IO, compression: str | None = 'infer', encoding: str = 'utf-8'):
+        self.path = None
+        self.compression = compression
+        self.encoding = encoding
+        super().__init__(input_data)
+
+    @GenericInputProcessor.input_data.setter
+    def input_data(self, path: str | IO):
+        """
+        Setter for input_data property. The file is not read until needed.
+
+        :param path: Path to input data, '-' or file-like object.
+        """
+        self.path = path
+        self._input_data = None
+
+    def iter_records(self) -> Generator:
+        """
+        Iterate over the entities in the file, one line at a time. Empty lines are skipped.
+
+        :return: Generator of entity contents.
+        """
+        if self._input_data is not None:
+            yield from super().iter_records()
+            return
+        with open_file(self.path, 'r', logger=self.logger, encoding=self.encoding,
+                       compression=self.compression) as jsonl_file:
+            records = (json.loads(line) for line in jsonl_file if line.strip())
+            if not self._transformations:
+                yield from records
+                return
+            # Transformations are applied to whole fields, so entities are transformed in chunks
+            while chunk := list(islice(records, self.TRANSFORMATION_CHUNK_SIZE)):
+                yield from self._transform_records(chunk)
+
+    def _transform_records(self, records: list[dict]) -> list[dict]:
+        """
+        Apply the pending transformations to the top-level fields of the entities. Fields missing in some of the
+        entities are not added to them (Unless filled by the transformations); fields set to None are kept.
+
+        :param records: list of entity contents.
+        :return: list of transformed entity contents.
+        """
+        if not self._transformations:
+            return records
+        # Missing fields are NaN in the dataframe, while None values are kept as None
+        dataframe = self._apply_transformations(DataFrame(records, dtype=object))
+        return [{field: value for field, value in record.items()
+                 if value is None or not (is_scalar(value) and isna(value))}
+                for record in dataframe.to_dict(orient='records')]
+
+    def iter_entities(self, entity: type[GenericEntity], data_model: type[BaseModel] | None = None) -> Generator:
+        """
+        Lazily create the metadata entities, one line at a time, with the trusted constructor. Entities are not
+        validated unless a `data_model` is provided: they are expected to have been saved from valid entities. With a
+        `data_model`, an entity failing validation raises as soon as it is reached.
+
+        :param entity: GenericEntity subclass (Not instance) to load the entities into.
+        :param data_model: Optional BaseModel subclass to validate each entity with.
+        :return: Generator of entities.
+        """
+        for record in self.iter_records():
+            yield entity.from_archive(record, data_model=data_model)
+
+    def process(self, entity: type[GenericEntity], max_workers: int = 1, chunk_size: int = 1000,
+                data_model: type[BaseModel] | None = None) -> list[GenericEntity]:
+        """
+        Load all the entities with the trusted constructor. Since entities are not rebuilt field by field, they are
+        loaded in the current process, in a single pass.
+
+        Entities are not validated unless a `data_model` is provided. If so, they are validated after loading, in one
+        pass (See :func:`~biobroker.metadata_entity.GenericEntity.validate_multiple`), and all the errors are raised
+        together. `max_workers` and `chunk_size` only apply to this validation.
+
+        :param entity: GenericEntity subclass (Not instance) to load the entities into.
+        :param max_workers: Number of processes to validate the entities with. Defaults to 1 (Current process).
+        :param chunk_size: Number of entities validated at once by each process.
+        :param data_model: Optional BaseModel subclass to validate the entities with.
+        :return: list of entities.
+        :raises EntitiesValidationError: if any of the entities fails validation.
+        """
+        entities = list(self.iter_entities(entity))
+        if data_model is not None:
+            errors = entity.validate_multiple(entities, data_model=data_model, max_workers=max_workers,
+                                              chunk_size=chunk_size)
+            if errors:
+                raise EntitiesValidationError(self.logger, errors)
+        return entities
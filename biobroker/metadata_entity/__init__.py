@@ -19,6 +19,13 @@ be turned to string.
 
 - verbose: set to `True` if you want `INFO` and above-level logging events. If not set or set to False, only `WARNING`
   and above will be displayed
+- data_model: Pydantic model used to validate the entity on creation. Set it to `None` to skip validation, e.g. to
+  validate many entities in one pass with `GenericEntity.validate_multiple`, which returns all the errors grouped by
+  entity index and field instead of raising on the first invalid entity.
+
+Many samples can also be held in a columnar `BiosampleFrame` (backed by a pandas DataFrame, one column per flattened
+field), which supports whole-column transformations and bulk validation, and can be saved directly by the output
+processors. Samples are converted from/to `Biosample` instances only when needed.
 
 **Subclasses of GenericEntity must define the following methods/properties**:
 
@@ -42,5 +49,6 @@ be turned to string.
 """
 
 from .metadata_entity import GenericEntity, Biosample
+from .frame import BiosampleFrame
 
-__all__ = ['GenericEntity', 'Biosample']
+__all__ = ['GenericEntity', 'Biosample', 'BiosampleFrame']
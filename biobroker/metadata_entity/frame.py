@@ -0,0 +1,153 @@
+import pandas
+from pydantic import BaseModel
+
+from biobroker.generic.logger import set_up_logger
+from biobroker.generic.pydantic_model import BiosampleGeneralModel
+from biobroker.metadata_entity.metadata_entity import Biosample
+
+
+class BiosampleFrame:
+    """
+    Columnar collection of Biosamples, backed by a pandas DataFrame. Samples are held in their flattened form, one row
+    per sample and one column per field: 'name', 'accession', 'release'... and one column per characteristic, plus
+    tag columns using the delimiter (e.g. 'size||unit', 'tissue||ontologyTerms').
+
+    Transformations can be applied to whole columns at once (`frame['organism'] = ...`) or to the underlying
+    :attr:`~BiosampleFrame.dataframe`, which is also handed as-is to the output processors. Samples are only turned into
+    :class:`~biobroker.metadata_entity.Biosample` instances when needed, with :func:`~BiosampleFrame.to_entities`.
+    Empty strings are kept as values, except in the relationship columns, where they mean no relationship (See
+    :func:`~BiosampleFrame.to_records`).
+
+    :param dataframe: DataFrame with the flattened samples.
+    :param delimiter: Delimiter used for the tag columns and multiple values. See :class:`~Biosample`.
+    :param verbose: Boolean indicating if the logger should be verbose.
+    """
+    def __init__(self, dataframe: pandas.DataFrame, delimiter: str = "||", verbose: bool = False):
+        self.logger = set_up_logger(self, verbose=verbose)
+        self.delimiter = delimiter
+        self.dataframe = dataframe
+
+    @classmethod
+    def from_records(cls, records: list[dict], delimiter: str = "||", verbose: bool = False) -> 'BiosampleFrame':
+        """
+        Create a frame from non-nested dictionaries, such as the input data of the input processors.
+
+        :param records: list of non-nested dictionaries, one per sample.
+        :param delimiter: Delimiter used for the tag columns and multiple values.
+        :param verbose: Boolean indicating if the logger should be verbose.
+        :return: BiosampleFrame
+        """
+        return cls(pandas.DataFrame.from_records(records), delimiter=delimiter, verbose=verbose)
+
+    @classmethod
+    def from_entities(cls, entities: list[Biosample], verbose: bool = False) -> 'BiosampleFrame':
+        """
+        Create a frame from a list of Biosamples, flattening them.
+
+        :param entities: list of Biosamples.
+        :param verbose: Boolean indicating if the logger should be verbose.
+        :return: BiosampleFrame
+        """
+        delimiter = entities[0].delimiter if entities else "||"
+        return cls.from_records([entity.flatten() for entity in entities], delimiter=delimiter, verbose=verbose)
+
+    @classmethod
+    def from_archive(cls, metadata_contents: list[dict], delimiter: str = "||",
+                     verbose: bool = False) -> 'BiosampleFrame':
+        """
+        Create a frame from samples as returned by the BioSamples API, without keeping a Biosample instance per sample.
+        See :func:`~Biosample.from_archive`.
+
+        :param metadata_contents: list of samples, as returned by the BioSamples API.
+        :param delimiter: Delimiter used for the tag columns and multiple values.
+        :param verbose: Boolean indicating if the logger should be verbose.
+        :return: BiosampleFrame
+        """
+        records = [Biosample.from_archive(content, delimiter=delimiter).flatten() for content in metadata_contents]
+        return cls.from_records(records, delimiter=delimiter, verbose=verbose)
+
+    def to_records(self) -> list[dict]:
+        """
+        Return the samples as non-nested dictionaries. Missing values are returned as None. Empty strings are kept,
+        except in the relationship columns (e.g. 'derived_from'), where they mean the sample has no relationship of
+        that type (See :func:`~biobroker.metadata_entity.Biosample.flatten`) and are also returned as None.
+
+        :return: list of non-nested dictionaries, one per sample.
+        """
+        dataframe = self.dataframe.astype(object)
+        dataframe = dataframe.where(dataframe.notna(), None)
+        relationship_columns = [column for column in dataframe.columns if column in Biosample.VALID_RELATIONSHIPS]
+        dataframe[relationship_columns] = dataframe[relationship_columns].replace('', None)
+        return dataframe.to_dict(orient='records')
+
+    def to_entities(self, data_model: type[BaseModel] | None = BiosampleGeneralModel) -> list[Biosample]:
+        """
+        Convert the frame into a list of Biosamples.
+
+        :param data_model: Data model to validate each sample with. Set to None to skip validation (e.g. if the frame
+                           has already been validated with :func:`~BiosampleFrame.validate`).
+        :return: list of Biosamples.
+        """
+        return [Biosample(record, data_model=data_model, delimiter=self.delimiter) for record in self.to_records()]
+
+    def validate(self, data_model: type[BaseModel] = BiosampleGeneralModel,
+                 max_workers: int = 1) -> dict[int, dict[str, list[str]]]:
+        """
+        Validate all the samples in one pass. Valid samples are normalised in the frame; invalid samples are left
+        untouched. See :func:`~biobroker.metadata_entity.GenericEntity.validate_multiple`.
+
+        :param data_model: Data model to validate the samples with.
+        :param max_workers: Number of processes to use for validation.
+        :return: Dictionary with the errors, as {<row position>: {<location>: [<messages>]}}. Empty if all the samples
+                 are valid.
+        """
+        entities = self.to_entities(data_model=None)
+        errors = Biosample.validate_multiple(entities, data_model=data_model, max_workers=max_workers)
+        dataframe = pandas.DataFrame.from_records([entity.flatten() for entity in entities])
+        # Keep the original order of the columns; columns created by the normalisation go last
+        columns = [column for column in self.dataframe.columns if column in dataframe.columns]
+        dataframe = dataframe[columns + [column for column in dataframe.columns if column not in columns]]
+        dataframe.index = self.dataframe.index
+        self.dataframe = dataframe
+        return errors
+
+    @property
+    def columns(self) -> list[str]:
+        """
+        Names of the columns (flattened fields) of the frame.
+
+        :return: list of column names.
+        """
+        return list(self.dataframe.columns)
+
+    def __len__(self) -> int:
+        return len(self.dataframe)
+
+    def __getitem__(self, column: str) -> pandas.Series:
+        """
+        Get a whole column of the frame.
+
+        :param column: Name of the column (e.g. 'organism', 'size||unit').
+        :return: pandas Series with the values of the column.
+        """
+        return self.dataframe[column]
+
+    def __setitem__(self, column: str, values):
+        """
+        Set a whole column of the frame, at once for all the samples.
+
+        :param column: Name of the column (e.g. 'organism', 'size||unit').
+        :param values: Single value, or one value per sample.
+        """
+        self.dataframe[column] = values
+
+    def __delitem__(self, column: str):
+        """
+        Delete a whole column of the frame.
+
+        :param column: Name of the column.
+        """
+        del self.dataframe[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.dataframe.columns
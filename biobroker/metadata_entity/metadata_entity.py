@@ -1,16 +1,21 @@
 import json
+import logging
 import re
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import pydantic_core
-from typing import Any, Type
+from typing import Any, ClassVar, Type
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 from biobroker.generic.pydantic_model import BiosampleGeneralModel
 from biobroker.metadata_entity.exceptions import (RelationshipInvalidSourceError, RelationshipInvalidTargetError,
                                                   EntityValidationError)
 from biobroker.generic.exceptions import MandatoryFunctionNotSet
 from biobroker.generic.logger import set_up_logger
+from biobroker.generic.utilities import parse_pydantic_error, slice_list
 
 # MONKEY PATCHING JSON ENCODER TO MAKE ENTITIES JSON SERIALIZABLE #
 def _default(self, obj):
@@ -21,18 +26,155 @@ _default.default = json.JSONEncoder().default
 json.JSONEncoder.default = _default
 
 
+def _to_json_compatible(value: Any) -> Any:
+    """
+    Copy a value, turning it into what `json.loads(json.dumps(value, default=str))` would return, without going through
+    a string.
+
+    :param value: Value to copy.
+    :return: JSON-compatible copy of the value.
+    """
+    if isinstance(value, dict):
+        return {_to_json_key(key): _to_json_compatible(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json_compatible(item) for item in value]
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    return str(value)
+
+
+def _to_json_key(key: Any) -> str:
+    """
+    Turn a dictionary key into a string, the same way `json.dumps` does.
+
+    :param key: Dictionary key.
+    :return: string
+    """
+    if isinstance(key, str):
+        return str(key)
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    return str(key)
+
+
+@lru_cache
+def _list_adapter(data_model: type[BaseModel]) -> TypeAdapter:
+    """
+    Build (once per data model) a TypeAdapter validating lists of entities.
+
+    :param data_model: BaseModel subclass.
+    :return: TypeAdapter for `list[data_model]`.
+    """
+    return TypeAdapter(list[data_model])
+
+
+def _validate_contents(data_model: type[BaseModel], contents: list[dict]) -> tuple[list, dict]:
+    """
+    Validate a list of metadata contents in one go. Module-level so it can be sent to worker processes.
+
+    :param data_model: BaseModel subclass determining the metadata model.
+    :param contents: list of metadata contents.
+    :return: Tuple (<normalised contents, None for the invalid ones>, <errors as {index: {location: [messages]}}>).
+    """
+    adapter = _list_adapter(data_model)
+    errors = {}
+    valid_indexes = range(len(contents))
+    try:
+        models = adapter.validate_python(contents)
+    except pydantic_core.ValidationError as pydantic_error:
+        for error in pydantic_error.errors():
+            location, message = parse_pydantic_error(error, skip_locations=1)
+            errors.setdefault(error['loc'][0], {}).setdefault(location, []).append(message)
+        # Validate again just the valid contents, to get their normalised version
+        valid_indexes = [index for index in valid_indexes if index not in errors]
+        models = adapter.validate_python([contents[index] for index in valid_indexes])
+    normalised = [None] * len(contents)
+    for index, content in zip(valid_indexes, adapter.dump_python(models, mode='json', exclude_unset=True,
+                                                                 by_alias=True)):
+        normalised[index] = content
+    return normalised, errors
+
+
 class GenericEntity:
     """
     Generic definition of metadata entity.
 
     :param metadata_content: dictionary with the content of the entity
-    :patam data_model: BaseModel subclass determining the metadata model to validate the `metadata_content`.
+    :patam data_model: BaseModel subclass determining the metadata model to validate the `metadata_content`. If set to
+                       None, the content is not validated on creation (See :func:`~GenericEntity.validate_multiple`).
+
+    Entities are kept compact, as millions of them may be held in memory: attributes are declared in `__slots__` and
+    the logger is shared by all the instances of a class (See :attr:`~GenericEntity.logger`).
     """
-    def __init__(self, metadata_content: dict, data_model: type[BaseModel], verbose: bool = False):
-        self.logger = set_up_logger(self, verbose=verbose)
+    __slots__ = ('_entity',)
+    _class_loggers: ClassVar[dict[type, logging.Logger]] = {}
+
+    def __init__(self, metadata_content: dict, data_model: type[BaseModel] | None, verbose: bool = False):
+        if verbose:
+            self._set_up_class_logger(verbose=True)
         self._entity = None
         self.entity = metadata_content
-        self.validate(data_model=data_model)
+        if data_model is not None:
+            self.validate(data_model=data_model)
+
+    @classmethod
+    def from_archive(cls, metadata_content: dict, data_model: type[BaseModel] | None = None, verbose: bool = False):
+        """
+        Trusted constructor for entities returned by the archive. The content is expected to be already in the format of
+        the archive and valid, so it is used as-is: fields are not set one by one and, unless a `data_model` is
+        provided, the content is not validated. Validation can still be run later on with
+        :func:`~GenericEntity.validate`.
+
+        :param metadata_content: dictionary with the content of the entity, as returned by the archive.
+        :param data_model: Optional BaseModel subclass to validate the content with.
+        :param verbose: Boolean indicating if the logger should be verbose.
+        :return: Instance of the entity.
+        """
+        if verbose:
+            cls._set_up_class_logger(verbose=True)
+        entity = cls.__new__(cls)
+        entity._entity = metadata_content
+        if data_model is not None:
+            entity.validate(data_model=data_model)
+        return entity
+
+    @classmethod
+    def _set_up_class_logger(cls, verbose: bool = False) -> logging.Logger:
+        """
+        Set up the logger shared by all the instances of the class. It is only set up once per class: the verbosity is
+        the one of the first set up.
+
+        :param verbose: Boolean indicating if the logger should be verbose.
+        :return: logging.Logger instance
+        """
+        logger = GenericEntity._class_loggers.get(cls)
+        if logger is None:
+            logger = GenericEntity._class_loggers[cls] = set_up_logger(cls.__new__(cls), verbose=verbose)
+        return logger
+
+    @classmethod
+    def clear_load_cache(cls):
+        """
+        Forget what was learnt about the input while creating entities from it (e.g. :class:`~Biosample` column plans),
+        so the next input is analysed, and warned about, from scratch. Called by the input processors at the start of
+        each load. Subclasses caching anything across instances must override it.
+        """
+
+    @property
+    def logger(self) -> logging.Logger:
+        """
+        Logger of the entity. Shared by all the instances of the class; set up the first time it is used (Or on creation
+        of the first verbose instance), not once per instance.
+
+        :return: logging.Logger instance
+        """
+        return GenericEntity._class_loggers.get(self.__class__) or self._set_up_class_logger()
 
     @property
     def entity(self) -> dict:
@@ -77,10 +219,47 @@ class GenericEntity:
         can be provided by the user on validation.
         """
         try:
-            self.entity = json.loads(data_model(**self.entity).model_dump_json(exclude_unset=True, by_alias=True))
+            self.entity = data_model.model_validate(self.entity).model_dump(mode='json', exclude_unset=True,
+                                                                            by_alias=True)
         except pydantic_core.ValidationError as pydantic_error:
             raise EntityValidationError(self.logger, entity_id=self.id, errors=pydantic_error.errors()) from None
 
+    @staticmethod
+    def validate_multiple(entities: list['GenericEntity'], data_model: type[BaseModel], max_workers: int = 1,
+                          chunk_size: int = 1000) -> dict[int, dict[str, list[str]]]:
+        """
+        Validate a list of entities in one pass, instead of one by one. Contrary to :func:`~GenericEntity.validate`,
+        it does not raise on the first invalid entity: all the errors are collected and returned. Valid entities are
+        normalised, the same way :func:`~GenericEntity.validate` does; invalid entities are left untouched.
+
+        Entities are validated in chunks of `chunk_size`. With `max_workers` > 1, chunks are validated in parallel, in
+        worker processes.
+
+        :param entities: list of GenericEntity subclasses. To skip the validation on creation, create them with
+                         `data_model=None`.
+        :param data_model: BaseModel subclass determining the metadata model.
+        :param max_workers: Number of processes to use. Defaults to 1 (Validation in the current process).
+        :param chunk_size: Number of entities validated at once.
+        :return: Dictionary with the errors, as {<index in entities>: {<location>: [<messages>]}}. Empty if all the
+                 entities are valid.
+        """
+        chunk_size = max(1, chunk_size)
+        chunks = [list(chunk) for chunk in slice_list([entity.entity for entity in entities], chunk_size)]
+        if max_workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                results = list(executor.map(_validate_contents, [data_model] * len(chunks), chunks))
+        else:
+            results = [_validate_contents(data_model, chunk) for chunk in chunks]
+
+        errors = {}
+        for chunk_number, (normalised, chunk_errors) in enumerate(results):
+            offset = chunk_number * chunk_size
+            for index, content in enumerate(normalised):
+                if content is not None:
+                    entities[offset + index].entity = content
+            errors.update({offset + index: entity_errors for index, entity_errors in chunk_errors.items()})
+        return errors
+
     def flatten(self):
         """
         Flatten the .entity, returning a non-nested dictionary.
@@ -123,7 +302,12 @@ class GenericEntity:
 
     # DECODER FUNCTIONS - DEFAULTS STR
     def to_json(self):
-        return json.loads(json.dumps(self.entity, default=str))
+        """
+        Return a JSON-compatible copy of the entity. Values that are not JSON serializable are turned to string.
+
+        :return: dictionary
+        """
+        return _to_json_compatible(self.entity)
 
 
 class Biosample(GenericEntity):
@@ -135,24 +319,51 @@ class Biosample(GenericEntity):
     is because... Biosamples also expects that! No clue why properties are defaulting to arrays.
 
     :param metadata_content: non-nested dictionary containing the metadata for the sample.
-    :param data_model: Optional parameter, used to evaluate the metadata content. Defaults to :cls:`~biobroker.generic.pydantic_model.BiosampleGeneralModel`
+    :param data_model: Optional parameter, used to evaluate the metadata content. Defaults to :cls:`~biobroker.generic.pydantic_model.BiosampleGeneralModel`.
+                       Set to None to skip validation on creation (e.g. to validate many samples at once with
+                       :func:`~GenericEntity.validate_multiple`).
     :param delimiter: optional parameter, used for key delimiters. Used mainly to manage attributes tags, such as
                       'unit' and 'ontologyTerms'. Explained further in
                       :func:`~broker.metadata_entity.biosample.Biosample.__setitem__`, point 4.
     :param verbose: True if logger should be set to INFO. Default WARNING.
     """
-    ROOT_PROPERTIES = ['name', 'release', 'relationships', 'accession', 'sraAccession', 'webinSubmissionAccountId',
-                       'status', 'update', 'characteristics', 'submittedVia', 'create', '_links', 'submitted', 'taxId',
-                       'structuredData', 'externalReferences', 'organization']
-    VALID_TAGS = ['text', 'ontologyTerms', 'unit', 'tag']
+    ROOT_PROPERTIES = frozenset(['name', 'release', 'relationships', 'accession', 'sraAccession',
+                                 'webinSubmissionAccountId', 'status', 'update', 'characteristics', 'submittedVia',
+                                 'create', '_links', 'submitted', 'taxId', 'structuredData', 'externalReferences',
+                                 'organization'])
+    VALID_TAGS = frozenset(['text', 'ontologyTerms', 'unit', 'tag'])
     VALID_RELATIONSHIPS = ["derived_from", "same_as"]
     EXTERNAL_REFERENCE_FIELD = "url"
     ORGANIZATION = "organizationName"
-    def __init__(self, metadata_content: dict, data_model: Type[BaseModel] = BiosampleGeneralModel,
+
+    __slots__ = ('_flattened', 'delimiter')
+
+    def __init__(self, metadata_content: dict, data_model: Type[BaseModel] | None = BiosampleGeneralModel,
                  delimiter: str = "||", verbose: bool = False):
         self.delimiter = delimiter
         super().__init__(metadata_content, data_model=data_model, verbose=verbose)
 
+    @classmethod
+    def from_archive(cls, metadata_content: dict, data_model: type[BaseModel] | None = None, delimiter: str = "||",
+                     verbose: bool = False) -> 'Biosample':
+        """
+        Trusted constructor for samples returned by BioSamples. The content is used as-is, without replaying
+        :func:`~Biosample.__setitem__` for each field nor validating it (Unless a `data_model` is provided). Please
+        note this means the content is not normalised either (e.g. 'Organism' is not renamed to 'organism').
+
+        :param metadata_content: Sample, as returned by the BioSamples API.
+        :param data_model: Optional parameter, used to evaluate the metadata content. Not validated if not provided.
+        :param delimiter: optional parameter, used for key delimiters. See :class:`~Biosample`.
+        :param verbose: True if logger should be set to INFO. Default WARNING.
+        :return: Biosample instance.
+        """
+        sample = super().from_archive(metadata_content, verbose=verbose)
+        sample.delimiter = delimiter
+        sample._flattened = None
+        if data_model is not None:
+            sample.validate(data_model=data_model)
+        return sample
+
     @property
     def id(self):
         """
@@ -178,17 +389,46 @@ class Biosample(GenericEntity):
 
         :param metadata: non-nested dictionary containing the metadata for the sample.
         """
+        self._flattened = None
         self._entity = {"characteristics": {}}
-        for field, value in metadata.items():
+        column_plan = _compile_column_plan(type(self), tuple(metadata), self.delimiter)
+        for (field, handling, name, tag_name), value in zip(column_plan, metadata.values()):
             if value is None:
                 continue
-            self[field] = value
+            match handling:
+                case 'root':
+                    self._entity[field] = value
+                case 'text' | 'tag':
+                    characteristics = self._entity['characteristics']
+                    characteristic = characteristics.get(name, [{}])[0]
+                    if handling == 'text':
+                        characteristic['text'] = value
+                    else:
+                        characteristic[tag_name] = value if tag_name != 'ontologyTerms' else value.split(self.delimiter)
+                    characteristics[name] = [characteristic]
+                case _:
+                    # Depends on the value or on the rest of the sample (e.g. relationships need the accession)
+                    self[field] = value
 
     def flatten(self) -> dict:
         """
         Flatten the :attr:`~Biosample.entity` property and return a non-nested dictionary. This will be mostly used for
         output generation.
 
+        The flattened dictionary is computed once and cached until the sample is modified through its methods
+        (Setting the entity, setting/deleting items or adding relationships, external references or organizations).
+        Please note that modifying the :attr:`~Biosample.entity` dictionary directly does not refresh the cache.
+
+        :return: flattened dictionary (A copy; modifying it does not modify the sample)
+        """
+        if self._flattened is None:
+            self._flattened = self._flatten()
+        return dict(self._flattened)
+
+    def _flatten(self) -> dict:
+        """
+        Flatten the :attr:`~Biosample.entity` property. See :func:`~Biosample.flatten`.
+
         :return: flattened dictionary
         """
         sample_json = self.to_json()
@@ -228,7 +468,8 @@ class Biosample(GenericEntity):
         :param key: Key to search for for deletion
         :return:
         """
-        if key in Biosample.ROOT_PROPERTIES:
+        self._flattened = None
+        if key in self.ROOT_PROPERTIES:
             del self.entity[key]
         else:
             keys = key.split(self.delimiter)
@@ -254,23 +495,24 @@ class Biosample(GenericEntity):
         :param key: name of the attribute.
         :param value: value of the attribute.
         """
+        self._flattened = None
 
         # Root values
-        if key in Biosample.ROOT_PROPERTIES:
+        if key in self.ROOT_PROPERTIES:
             self.entity[key] = value
         # Relationships
-        elif self.accession and key in Biosample.VALID_RELATIONSHIPS and all([
+        elif self.accession and key in self.VALID_RELATIONSHIPS and all([
             self.check_accession(accession) for accession in value.split(self.delimiter)]):
             for target in value.split(self.delimiter):
                 self.add_relationship(source=self.accession,
                                       target=target,
                                       relationship=key)
         # External references
-        elif key == Biosample.EXTERNAL_REFERENCE_FIELD:
+        elif key == self.EXTERNAL_REFERENCE_FIELD:
             for url in value.split(self.delimiter):
                 self.add_external_reference(url=url)
         # Organizations - Since there is no documentation I will assume it only has a name
-        elif key == Biosample.ORGANIZATION:
+        elif key == self.ORGANIZATION:
             for organization in value.split(self.delimiter):
                 self.add_organization(organization=organization)
         # characteristics
@@ -313,6 +555,7 @@ class Biosample(GenericEntity):
         if not self.check_accession(target):
             raise RelationshipInvalidTargetError(logger=self.logger, target=target, sample_id=self.id)
 
+        self._flattened = None
         if 'relationships' not in self.entity:
             self.entity['relationships'] = []
         self.entity['relationships'].append({
@@ -327,11 +570,13 @@ class Biosample(GenericEntity):
 
         :param url: URL to the external reference
         """
+        self._flattened = None
         if 'externalReferences' not in self.entity:
             self.entity['externalReferences'] = []
         self.entity['externalReferences'].append({'url': url})
 
     def add_organization(self, organization):
+        self._flattened = None
         if 'organization' not in self.entity:
             self.entity['organization'] = []
         self.entity['organization'].append({'Name': organization})
@@ -406,8 +651,8 @@ class Biosample(GenericEntity):
         """
         return True if re.match('^SAM[NED](\\w)?\\d+$', accession) else False
 
-    @staticmethod
-    def _tag_is_valid(tag: str) -> bool:
+    @classmethod
+    def _tag_is_valid(cls, tag: str) -> bool:
         """
         Check if a tag is valid. Tags are evaluated against the :attr:`~Biosample.VALID_TAGS` global. VALID_TAGS extracted from:
         https://www.ebi.ac.uk/biosamples/docs/references/api/submit#_sample
@@ -415,7 +660,15 @@ class Biosample(GenericEntity):
         :param tag: string with the tag name
         :return: True if valid, False if invalid
         """
-        return tag in Biosample.VALID_TAGS
+        return tag in cls.VALID_TAGS
+
+    @classmethod
+    def clear_load_cache(cls):
+        """
+        Forget the column plans compiled so far (See :func:`_compile_column_plan`), so undocumented tags are warned
+        about again on the next load.
+        """
+        _compile_column_plan.cache_clear()
 
     @staticmethod
     def guidelines() -> str:
@@ -427,6 +680,46 @@ class Biosample(GenericEntity):
         return BIOSAMPLES_GUIDELINES
 
 
+@lru_cache(maxsize=256)
+def _compile_column_plan(entity_class: type[Biosample], columns: tuple[str, ...],
+                         delimiter: str) -> tuple[tuple[str, str, str, str | None], ...]:
+    """
+    Analyse the fields (Columns) of a non-nested sample once, deciding how each of them is loaded into a Biosample (Or
+    subclass, following its :attr:`~Biosample.ROOT_PROPERTIES`, :attr:`~Biosample.VALID_TAGS`...). Rows from the same
+    sheet share their columns, so the plan is cached and reused for all of them, until the next load (See
+    :func:`~Biosample.clear_load_cache`). See :func:`~Biosample.__setitem__` for the rules. If a subclass overrides
+    :func:`~Biosample.__setitem__`, all the fields are set through it.
+
+    Invalid tags are warned about when the plan is compiled: once per column and load, instead of once per sample.
+
+    :param entity_class: Biosample class (Or subclass) the samples are loaded into.
+    :param columns: Names of the fields, in order.
+    :param delimiter: Delimiter of the tags. See :class:`~Biosample`.
+    :return: Tuple with (<field>, <handling>, <characteristic name>, <tag name>) for each field. Handling is one of
+             'root', 'text' (characteristic), 'tag' (characteristic tag) or 'item' (resolved for each value by
+             :func:`~Biosample.__setitem__`: relationships, external references, organizations...).
+    """
+    if entity_class.__setitem__ is not Biosample.__setitem__:
+        return tuple((field, 'item', field, None) for field in columns)
+    column_plan = []
+    for field in columns:
+        if field in entity_class.ROOT_PROPERTIES:
+            column_plan.append((field, 'root', field, None))
+        elif (field in entity_class.VALID_RELATIONSHIPS or field == entity_class.EXTERNAL_REFERENCE_FIELD
+              or field == entity_class.ORGANIZATION or field.count(delimiter) > 1):
+            column_plan.append((field, 'item', field, None))
+        elif delimiter in field:
+            name, tag_name = field.split(delimiter)
+            if not entity_class._tag_is_valid(tag_name):
+                logger = entity_class._set_up_class_logger()
+                logger.warning(f"Tag '{tag_name}' on property '{name}' is not a documented valid tag. "
+                               "It may be rejected on submission.")
+            column_plan.append((field, 'tag', name, tag_name))
+        else:
+            column_plan.append((field, 'text', field, None))
+    return tuple(column_plan)
+
+
 BIOSAMPLES_GUIDELINES = "A Biosamples entity MUST have the following properties set:\n" \
                         "\t- name: a descriptive title for the sample\n" \
                         "\t- organism: a string that validates against NCBITaxon records \n" \
@@ -1,6 +1,7 @@
 """
 Output metadata processor. The goal of this module is to take an input list of GenericEntity's, transform it into a
-dataframe and save it with pandas functionality into different formats. Pretty simple!
+dataframe and save it with pandas functionality into different formats. Pretty simple! A `BiosampleFrame` can also be
+saved, skipping the transformation.
 
 **Mandatory arguments**:
 
@@ -9,13 +10,31 @@ dataframe and save it with pandas functionality into different formats. Pretty s
 **Optional arguments**:
 
 - verbose: set to `True` if you want `INFO` and above-level logging events. If not set or set to False, only `WARNING`
-           and above will be displayed
+    and above will be displayed
+- streaming: set to `True` to write the entities as they are received (e.g. from a generator), without building a
+             dataframe. Only for subclasses defining `_save_stream`.
 
 **Subclasses of GenericOutputProcessor must define the following methods/properties**:
 
 - _save
-"""
 
-from .output_processor import GenericOutputProcessor, TsvOutputProcessor, XlsxOutputProcessor
+**Subclasses of GenericOutputProcessor supporting streaming must also define**:
+
+- _save_stream
+"""
 
-__all__ = ['GenericOutputProcessor', 'TsvOutputProcessor', 'XlsxOutputProcessor']
+from .output_processor import (
+    GenericOutputProcessor,
+    JsonlOutputProcessor,
+    ParquetOutputProcessor,
+    TsvOutputProcessor,
+    XlsxOutputProcessor,
+)
+
+__all__ = [
+    'GenericOutputProcessor',
+    'JsonlOutputProcessor',
+    'ParquetOutputProcessor',
+    'TsvOutputProcessor',
+    'XlsxOutputProcessor',
+]
@@ -1,8 +1,26 @@
+import csv
+import json
+import os
+import pickle
+import shutil
+import stat
+import tempfile
+from collections.abc import Iterable
+from itertools import islice
+from typing import IO
+
 import pandas
+from openpyxl import Workbook
 
 from biobroker.generic.exceptions import MandatoryFunctionNotSet
 from biobroker.generic.logger import set_up_logger
-from biobroker.metadata_entity import GenericEntity
+from biobroker.generic.utilities import (
+    import_optional_dependency,
+    infer_compression,
+    is_stream,
+    open_file,
+)
+from biobroker.metadata_entity import BiosampleFrame, GenericEntity
 
 
 class GenericOutputProcessor:
@@ -10,17 +28,31 @@ class GenericOutputProcessor:
     Generic output processor. Defines the mandatory functions for the subclasses to function.
 
     :param output_path: path to save the file. Please include the name and extension of the file.
+    :param verbose: Boolean indicating if the logger should be verbose.
+    :param streaming: Boolean indicating if the entities should be written as they are received, instead of being
+                      transformed into a dataframe first. Only for subclasses defining `_save_stream`.
     """
-    def __init__(self, output_path: str, verbose: bool = False):
+    def __init__(self, output_path: str, verbose: bool = False, streaming: bool = False):
         self.logger = set_up_logger(self, verbose=verbose)
         self.path = output_path
+        self.streaming = streaming
 
-    def save(self, entities: list[GenericEntity]):
+    def save(self, entities: Iterable[GenericEntity] | BiosampleFrame):
         """
-        Transform the entities into a dataframe to use pandas functionality to save.
+        Transform the entities into a dataframe to use pandas functionality to save. A
+        :class:`~biobroker.metadata_entity.BiosampleFrame` is already a dataframe, and is saved as-is.
 
-        :param entities: Subclasses of GenericEntity.
+        In streaming mode, entities can be any iterable (e.g. a generator of search results): they are flattened and
+        written one by one, without holding them all in memory.
+
+        :param entities: Subclasses of GenericEntity, or a BiosampleFrame.
         """
+        if isinstance(entities, BiosampleFrame):
+            self._save(entities.dataframe)
+            return
+        if self.streaming:
+            self._save_stream(entity.flatten() for entity in entities)
+            return
         json_to_save = [entity.flatten() for entity in entities]
         dataframe = pandas.DataFrame(json_to_save)
         self._save(dataframe)
@@ -33,15 +65,66 @@ class GenericOutputProcessor:
         """
         raise MandatoryFunctionNotSet(logger=self.logger)
 
+    def _save_stream(self, records: Iterable[dict]):
+        """
+        Function to be overriden by subclasses supporting streaming. Takes the flattened entities, one by one, and
+        saves them into self.path as they are received.
+
+        :param records: Iterable of flattened entities.
+        """
+        raise MandatoryFunctionNotSet(logger=self.logger)
+
+    def _temporary_path(self, suffix: str) -> str:
+        """
+        Create a temporary file in the same directory as the output, so it can be moved in place atomically.
+
+        :param suffix: Suffix of the temporary file.
+        :return: Path to the temporary file.
+        """
+        # Streams can't be replaced: their temporary files go to the default temporary directory
+        directory = None if is_stream(self.path) else os.path.dirname(os.path.abspath(self.path))
+        file_descriptor, path = tempfile.mkstemp(dir=directory, suffix=suffix)
+        os.close(file_descriptor)
+        return path
+
+    def _replace_output(self, path: str):
+        """
+        Atomically replace the output with a fully written temporary file (See
+        :func:`~GenericOutputProcessor._temporary_path`). Temporary files are only readable by their owner, so they are
+        given the permissions of the output first: the ones of the existing file, or the default ones for new files
+        (0o666 minus the umask), the same as if the output had been written directly.
+
+        :param path: Path to the temporary file.
+        """
+        try:
+            mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(path, mode)
+        os.replace(path, self.path)
+
 
 class TsvOutputProcessor(GenericOutputProcessor):
     """
     TSV output processor. Takes a list of entities and outputs a TSV with the metadata processed.
 
-    :param output_path: Path to the file being saved. Please include tsv extension.
+    The file is compressed if the path ends with '.gz' (gzip), '.bz2' (bz2) or '.zst' (zstd, requires the optional
+    dependency 'zstandard': `pip install biobroker[zstd]`). Instead of a path, the output can be '-' (stdout) or a
+    file-like object (e.g. to pipe the output to other tools).
+
+    :param output_path: Path to the file being saved, '-' or file-like object. Please include tsv extension.
+    :param streaming: Boolean indicating if the entities should be written as they are received. See
+                      :func:`~TsvOutputProcessor._save_stream`.
+    :param encoding: Encoding of the file. Defaults to 'utf-8'.
+    :param compression: 'gzip', 'bz2', 'zstd' or None. Inferred from the extension of the path by default.
     """
-    def __init__(self, output_path: str):
-        super().__init__(output_path)
+    def __init__(self, output_path: str | IO, streaming: bool = False, encoding: str = 'utf-8',
+                 compression: str | None = 'infer'):
+        super().__init__(output_path, streaming=streaming)
+        self.encoding = encoding
+        self.compression = compression
 
     def _save(self, dataframe: pandas.DataFrame):
         """
@@ -52,7 +135,85 @@ class TsvOutputProcessor(GenericOutputProcessor):
         :param dataframe: Dataframe containing the flattened metadata from the GenericEntity subclasses.
         """
         separator = '\t'
-        dataframe.to_csv(self.path, sep=separator, index=False)
+        with self._open() as tsv_file:
+            dataframe.to_csv(tsv_file, sep=separator, index=False)
+
+    def _save_stream(self, records: Iterable[dict]):
+        """
+        Write the flattened entities into a tsv as they are received. The columns are the fields of the first entity;
+        fields that only appear in later entities are added as new columns at the end. Rows are first spilled to a
+        temporary file next to the output: if new columns appeared, the header is rewritten (and the previous rows
+        padded) in a second pass over the file. Either way, the output is only replaced (Or compressed, or written into
+        the stream) once fully written.
+
+        :param records: Iterable of flattened entities.
+        """
+        columns = {}
+        header_size = None
+        spill_path = self._temporary_path('.tsv.tmp')
+        try:
+            with open(spill_path, 'w', newline='', encoding=self.encoding) as spill_file:
+                writer = csv.writer(spill_file, delimiter='\t', lineterminator='\n')
+                for record in records:
+                    for column in record:
+                        columns.setdefault(column, len(columns))
+                    if header_size is None:
+                        header_size = len(columns)
+                        writer.writerow(columns)
+                    writer.writerow([record.get(column) for column in columns])
+            if header_size is not None and len(columns) > header_size:
+                self.logger.info(f"{len(columns) - header_size} new columns found while writing: rewriting header.")
+                self._rewrite_header(spill_path, list(columns))
+            else:
+                self._publish(spill_path)
+        finally:
+            if os.path.exists(spill_path):
+                os.remove(spill_path)
+
+    def _rewrite_header(self, spill_path: str, columns: list[str]):
+        """
+        Rewrite the spilled tsv into self.path with the final header, padding the rows written before new columns
+        appeared.
+
+        :param spill_path: Path to the spilled tsv.
+        :param columns: Final list of columns.
+        """
+        rewrite_path = self._temporary_path('.tsv.tmp')
+        try:
+            with open(spill_path, 'r', newline='', encoding=self.encoding) as spill_file, \
+                    open(rewrite_path, 'w', newline='', encoding=self.encoding) as rewrite_file:
+                reader = csv.reader(spill_file, delimiter='\t')
+                writer = csv.writer(rewrite_file, delimiter='\t', lineterminator='\n')
+                next(reader)
+                writer.writerow(columns)
+                for row in reader:
+                    writer.writerow(row + [''] * (len(columns) - len(row)))
+            self._publish(rewrite_path)
+        finally:
+            if os.path.exists(rewrite_path):
+                os.remove(rewrite_path)
+
+    def _publish(self, path: str):
+        """
+        Move a fully written temporary tsv into the output. Uncompressed files are replaced atomically; otherwise, the
+        temporary file is compressed into the output (Or copied into the stream) in a single pass.
+
+        :param path: Path to the temporary tsv.
+        """
+        compression = infer_compression(self.path) if self.compression == 'infer' else self.compression
+        if not is_stream(self.path) and compression is None:
+            self._replace_output(path)
+            return
+        with open(path, 'r', newline='', encoding=self.encoding) as temporary_file, self._open() as tsv_file:
+            shutil.copyfileobj(temporary_file, tsv_file)
+
+    def _open(self):
+        """
+        Open the output for writing, encoding and compressing it. See :func:`~biobroker.generic.utilities.open_file`.
+
+        :return: Context manager with the file object, in text mode.
+        """
+        return open_file(self.path, 'w', logger=self.logger, encoding=self.encoding, compression=self.compression)
 
 
 class XlsxOutputProcessor(GenericOutputProcessor):
@@ -60,9 +221,15 @@ class XlsxOutputProcessor(GenericOutputProcessor):
     Excel output processor. Takes a list of entities and outputs an excel file with the metadata processed.
 
     :param output_path: Path to the file being saved. Please include '.xlsx' extension.
+    :param sheet_name: Name of the worksheet.
+    :param streaming: Boolean indicating if the entities should be written as they are received, with a write-only
+                      workbook. See :func:`~XlsxOutputProcessor._save_stream`.
     """
-    def __init__(self, output_path, sheet_name: str = 'Sheet1'):
-        super().__init__(output_path)
+    EXCEL_MAX_ROWS = 1048576
+    EXCEL_MAX_SHEET_NAME_LENGTH = 31
+
+    def __init__(self, output_path, sheet_name: str = 'Sheet1', streaming: bool = False):
+        super().__init__(output_path, streaming=streaming)
         self.sheet_name = sheet_name
 
     def _save(self, dataframe: pandas.DataFrame):
@@ -72,3 +239,326 @@ class XlsxOutputProcessor(GenericOutputProcessor):
         :param dataframe: Dataframe containing the flattened metadata from the GenericEntity subclasses.
         """
         dataframe.to_excel(self.path, index=False, sheet_name=self.sheet_name, engine='openpyxl')
+
+    def _save_stream(self, records: Iterable[dict]):
+        """
+        Write the flattened entities into an excel as they are received, using an openpyxl write-only workbook (Rows
+        are not kept in memory as cell objects). When a worksheet reaches the excel row limit
+        (:attr:`~XlsxOutputProcessor.EXCEL_MAX_ROWS`, header included), writing continues on a new worksheet, named
+        '<sheet_name>_2', '<sheet_name>_3'... (The sheet name is truncated to fit the suffix within the excel limit of
+        :attr:`~XlsxOutputProcessor.EXCEL_MAX_SHEET_NAME_LENGTH` characters).
+
+        The columns are the fields of the first entity. Rows can't be modified once written in a write-only workbook,
+        so the entities are also spilled (Pickled, keeping the type of the values) to a temporary file: if fields
+        appear in later entities, the workbook is written again from the spilled entities, with the final header.
+
+        :param records: Iterable of flattened entities.
+        """
+        columns = {}
+        spill_path = self._temporary_path('.pickle.tmp')
+        workbook_path = self._temporary_path('.xlsx.tmp')
+        try:
+            with open(spill_path, 'wb') as spill_file:
+                header_size = self._write_workbook(workbook_path, self._spill(records, spill_file), columns)
+            if header_size < len(columns):
+                self.logger.info(f"{len(columns) - header_size} new columns found while writing: rewriting workbook.")
+                with open(spill_path, 'rb') as spill_file:
+                    self._write_workbook(workbook_path, self._read_spill(spill_file), columns)
+            self._replace_output(workbook_path)
+        finally:
+            for path in (spill_path, workbook_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _write_workbook(self, path: str, records: Iterable[dict], columns: dict) -> int:
+        """
+        Write the records into a write-only workbook, rolling over to a new worksheet when the row limit is reached.
+
+        :param path: Path to save the workbook.
+        :param records: Iterable of flattened entities.
+        :param columns: Columns known so far, as {<column>: <position>}. Updated with the fields found in the records.
+        :return: Number of columns in the header of the workbook.
+        """
+        workbook = Workbook(write_only=True)
+        header = None
+        worksheet = None
+        worksheet_rows = 0
+        for record in records:
+            for column in record:
+                columns.setdefault(column, len(columns))
+            if header is None:
+                header = list(columns)
+            if worksheet is None or worksheet_rows >= self.EXCEL_MAX_ROWS:
+                worksheet = workbook.create_sheet(self._worksheet_name(len(workbook.worksheets) + 1))
+                worksheet.append(header)
+                worksheet_rows = 1
+            worksheet.append([record.get(column) for column in header])
+            worksheet_rows += 1
+        if worksheet is None:
+            workbook.create_sheet(self.sheet_name)
+        workbook.save(path)
+        return len(header or [])
+
+    def _worksheet_name(self, worksheet_number: int) -> str:
+        """
+        Name of the n-th worksheet of the workbook: '<sheet_name>' for the first one, '<sheet_name>_<n>' for the rest.
+        The sheet name is truncated so the suffix fits within :attr:`~XlsxOutputProcessor.EXCEL_MAX_SHEET_NAME_LENGTH`.
+
+        :param worksheet_number: Position of the worksheet, starting at 1.
+        :return: Name of the worksheet.
+        """
+        if worksheet_number == 1:
+            return self.sheet_name
+        suffix = f"_{worksheet_number}"
+        return self.sheet_name[:self.EXCEL_MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+
+    @staticmethod
+    def _spill(records: Iterable[dict], spill_file) -> Iterable[dict]:
+        """
+        Write each record to the spill file (Pickled, keeping the type of the values) as it goes through.
+
+        :param records: Iterable of flattened entities.
+        :param spill_file: Open file to spill the records to, in binary mode.
+        :return: Generator of the same records.
+        """
+        for record in records:
+            pickle.dump(record, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+            yield record
+
+    @staticmethod
+    def _read_spill(spill_file) -> Iterable[dict]:
+        """
+        Read back the records written to the spill file by :func:`~XlsxOutputProcessor._spill`.
+
+        :param spill_file: Open spill file, in binary mode.
+        :return: Generator of records.
+        """
+        while True:
+            try:
+                yield pickle.load(spill_file)
+            except EOFError:
+                return
+
+
+class ParquetOutputProcessor(GenericOutputProcessor):
+    """
+    Parquet output processor. Takes a list of entities and outputs a parquet file with the metadata processed, keeping
+    the type of each column. Requires the optional dependency 'pyarrow' (`pip install biobroker[parquet]`).
+
+    :param output_path: Path to the file being saved. Please include '.parquet' extension.
+    :param compression: Compression codec for the columns ('zstd', 'snappy', 'gzip', 'brotli', 'lz4' or 'none').
+    :param compression_level: Compression level, if supported by the codec. Defaults to the codec default.
+    :param row_group_size: Maximum number of rows per row group. In streaming mode, entities are written one row group
+                           at a time.
+    :param streaming: Boolean indicating if the entities should be written as they are received, one row group at a
+                      time. See :func:`~ParquetOutputProcessor._save_stream`.
+    """
+    def __init__(self, output_path: str, compression: str = 'zstd', compression_level: int | None = None,
+                 row_group_size: int = 100000, streaming: bool = False):
+        super().__init__(output_path, streaming=streaming)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.row_group_size = row_group_size
+        self.pyarrow = import_optional_dependency('pyarrow', extra='parquet', logger=self.logger)
+        self.parquet = import_optional_dependency('pyarrow.parquet', extra='parquet', logger=self.logger)
+
+    def _save(self, dataframe: pandas.DataFrame):
+        """
+        Save the resulting dataframe from :func:`~GenericOutputProcessor.save` into a parquet file.
+
+        :param dataframe: Dataframe containing the flattened metadata from the GenericEntity subclasses.
+        """
+        try:
+            table = self.pyarrow.Table.from_pandas(dataframe, preserve_index=False)
+        except (self.pyarrow.ArrowInvalid, self.pyarrow.ArrowTypeError):
+            # Columns mixing types (e.g. numbers and text) are saved as text
+            mixed_columns = dataframe.select_dtypes(include='object').columns
+            table = self.pyarrow.Table.from_pandas(dataframe.astype({column: 'string' for column in mixed_columns}),
+                                                   preserve_index=False)
+        self.parquet.write_table(table, self.path, row_group_size=self.row_group_size, compression=self.compression,
+                                 compression_level=self.compression_level)
+
+    def _save_stream(self, records: Iterable[dict]):
+        """
+        Write the flattened entities into a parquet file as they are received, one row group (of `row_group_size`
+        entities) at a time.
+
+        The schema is taken from the first row group. If a later row group has new fields (or fields with a different
+        type), the schema is extended (Conflicting types are saved as text) and the row groups already written are
+        rewritten, one at a time, with the new schema. The output is only replaced once fully written.
+
+        :param records: Iterable of flattened entities.
+        """
+        path = self._temporary_path('.parquet.tmp')
+        writer = None
+        try:
+            records = iter(records)
+            while row_group := list(islice(records, self.row_group_size)):
+                table = self._to_table(row_group)
+                if writer is None:
+                    writer = self._writer(path, table.schema)
+                elif not self._fits(table.schema, writer.schema):
+                    self.logger.info("New fields found while writing: rewriting previous row groups.")
+                    writer.close()
+                    path, writer = self._rewrite(path, self._merge_schemas(writer.schema, table.schema))
+                writer.write_table(self._conform(table, writer.schema))
+            if writer is None:
+                writer = self._writer(path, self.pyarrow.schema([]))
+            writer.close()
+            self._replace_output(path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _writer(self, path: str, schema):
+        """
+        Open a parquet writer with the compression options of the processor.
+
+        :param path: Path to write to.
+        :param schema: pyarrow schema of the file.
+        :return: pyarrow.parquet.ParquetWriter
+        """
+        return self.parquet.ParquetWriter(path, schema, compression=self.compression,
+                                          compression_level=self.compression_level)
+
+    def _rewrite(self, path: str, schema) -> tuple:
+        """
+        Rewrite a parquet file with a new schema, one row group at a time.
+
+        :param path: Path to the parquet file to rewrite. Deleted once rewritten.
+        :param schema: New pyarrow schema.
+        :return: Tuple (<path to the new file>, <open writer for the new file>).
+        """
+        new_path = self._temporary_path('.parquet.tmp')
+        writer = self._writer(new_path, schema)
+        parquet_file = self.parquet.ParquetFile(path)
+        for row_group in range(parquet_file.num_row_groups):
+            writer.write_table(self._conform(parquet_file.read_row_group(row_group), schema))
+        parquet_file.close()
+        os.remove(path)
+        return new_path, writer
+
+    def _to_table(self, records: list[dict]):
+        """
+        Build a pyarrow table from flattened entities, with the fields of all of them. Fields mixing types (e.g.
+        numbers and text) are saved as text.
+
+        :param records: list of flattened entities.
+        :return: pyarrow.Table
+        """
+        columns = {}
+        for column in dict.fromkeys(column for record in records for column in record):
+            values = [record.get(column) for record in records]
+            try:
+                columns[column] = self.pyarrow.array(values)
+            except (self.pyarrow.ArrowInvalid, self.pyarrow.ArrowTypeError):
+                columns[column] = self.pyarrow.array([None if value is None else str(value) for value in values],
+                                                     type=self.pyarrow.string())
+        return self.pyarrow.table(columns)
+
+    @staticmethod
+    def _fits(schema, target_schema) -> bool:
+        """
+        Check if a table with `schema` can be written with `target_schema`: same fields or a subset of them, with the
+        same types (Or null, for fields with no values).
+
+        :return: True if it fits, False otherwise.
+        """
+        return all(field.name in target_schema.names and
+                   (field.type == target_schema.field(field.name).type or field.type == 'null')
+                   for field in schema)
+
+    def _merge_schemas(self, schema, new_schema):
+        """
+        Extend a schema with the fields of a new one. Fields with no values (null) take the type of the other schema;
+        fields with different types become text.
+
+        :return: merged pyarrow schema.
+        """
+        fields = {field.name: field.type for field in schema}
+        for field in new_schema:
+            current_type = fields.get(field.name)
+            if current_type is None or current_type == 'null':
+                fields[field.name] = field.type
+            elif field.type != current_type and field.type != 'null':
+                fields[field.name] = self.pyarrow.string()
+        return self.pyarrow.schema(list(fields.items()))
+
+    def _conform(self, table, schema):
+        """
+        Conform a table to a schema: reorder the fields, fill in the missing ones with nulls and cast the types.
+
+        :return: pyarrow.Table with the given schema.
+        """
+        columns = []
+        for field in schema:
+            if field.name not in table.column_names:
+                columns.append(self.pyarrow.nulls(table.num_rows, field.type))
+                continue
+            column = table.column(field.name)
+            if column.type != field.type:
+                column = column.cast(field.type)
+            columns.append(column)
+        return self.pyarrow.Table.from_arrays(columns, schema=schema)
+
+
+class JsonlOutputProcessor(GenericOutputProcessor):
+    """
+    JSON Lines output processor. Writes the entities as they are received, one per line, in their native (nested)
+    format instead of flattened: nothing is lost (e.g. tags of multiple values of a characteristic) and the file can be
+    loaded back as-is with :class:`~biobroker.input_processor.JsonlInputProcessor`. Entities can be any iterable (e.g.
+    a generator of search results); they are never all held in memory.
+
+    The file is compressed if the path ends with '.gz' (gzip), '.bz2' (bz2) or '.zst' (zstd, requires the optional
+    dependency 'zstandard': `pip install biobroker[zstd]`). Instead of a path, the output can be '-' (stdout) or a
+    file-like object.
+
+    :param output_path: Path to the file being saved, '-' or file-like object. Please include '.jsonl' extension (e.g.
+                        'samples.jsonl.gz').
+    :param compression: 'gzip', 'bz2', 'zstd' or None. Inferred from the extension of the path by default.
+    :param encoding: Encoding of the file. Defaults to 'utf-8'.
+    """
+    def __init__(self, output_path: str | IO, compression: str | None = 'infer', encoding: str = 'utf-8'):
+        super().__init__(output_path, streaming=True)
+        self.compression = compression
+        self.encoding = encoding
+
+    def save(self, entities: Iterable[GenericEntity] | BiosampleFrame):
+        """
+        Write the entities into the file, one per line. A :class:`~biobroker.metadata_entity.BiosampleFrame` is turned
+        into Biosamples first, without validating them.
+
+        Files are written into a temporary file, which replaces the output once fully written. Streams are written
+        straight away.
+
+        :param entities: Subclasses of GenericEntity, or a BiosampleFrame.
+        """
+        if isinstance(entities, BiosampleFrame):
+            entities = entities.to_entities(data_model=None)
+        if is_stream(self.path):
+            self._write(self.path, entities, self.compression)
+            return
+        path = self._temporary_path('.jsonl.tmp')
+        # The temporary file has no extension to infer the compression from
+        compression = infer_compression(self.path) if self.compression == 'infer' else self.compression
+        try:
+            self._write(path, entities, compression)
+            self._replace_output(path)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _write(self, path: str | IO, entities: Iterable[GenericEntity], compression: str | None):
+        """
+        Write the entities, one per line.
+
+        :param path: Path to the file, '-' or file-like object.
+        :param entities: Subclasses of GenericEntity.
+        :param compression: Compression of the file.
+        """
+        with open_file(path, 'w', logger=self.logger, encoding=self.encoding, compression=compression) as jsonl_file:
+            for entity in entities:
+                jsonl_file.write(json.dumps(entity.entity, default=str))
+                jsonl_file.write('\n')
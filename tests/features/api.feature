@@ -33,4 +33,88 @@ Feature: API unit tests
   Scenario: Structured data - Invalid accession (Biosamples)
     Given a valid structured data object with an invalid accession
     When the structured data is submitted to Biosamples
-    Then it should raise an error regarding the accession
\ No newline at end of file
+    Then it should raise an error regarding the accession
+
+  Scenario: Retrieve multiple samples concurrently (Biosamples)
+    Given a list of accessions with a repeated accession and a missing accession
+    When the samples are retrieved with the BsdApi using 4 workers
+    Then the samples should be retrieved in the same order as the accessions, requesting each accession once
+    And the missing accession should be reported as a failure, by position
+
+  Scenario: Update multiple samples concurrently with failing samples (Biosamples)
+    Given 4 Biosample filled with content from assets/accessioned_BsdApi_entity.json
+    And the second and fourth samples have the same invalid accession
+    When the samples are updated with the BsdApi using 2 workers
+    Then the valid samples should be updated and each invalid sample reported as a failure, by position
+
+  Scenario: Submit multiple samples in concurrent chunks (Biosamples)
+    Given 12 Biosample filled with content from assets/valid_minimal.json
+    When the samples are submitted with the BsdApi in chunks of 5 using 3 workers
+    Then the submitted samples should be returned in the same order as the input
+
+  Scenario: Resume a failed bulk submission with a journal (Biosamples)
+    Given 12 Biosample filled with content from assets/valid_minimal.json
+    When the samples are submitted in chunks of 5 with a journal and the second chunk fails
+    And the samples are submitted again with the same journal
+    Then only the samples from the failed chunk should be submitted again
+
+  Scenario: Lazily search samples with a limit (Biosamples)
+    Given a search in Biosamples returning 45 samples in pages of 10
+    When I iterate over the search results with a limit of 15 samples
+    Then I should get 15 samples, requesting only 2 pages
+
+  Scenario Outline: Search samples prefetching pages concurrently (Biosamples)
+    Given a search in Biosamples returning 45 samples in pages of 10
+    When I search for samples prefetching <prefetch> pages
+    Then I should get all the 45 samples in order, requesting each page once
+    And the pages after the first should be requested in the background
+
+    Examples:
+    | prefetch |
+    | 1        |
+    | 3        |
+
+  Scenario: Search samples prefetching pages, when deep pages are only reachable with cursors (Biosamples)
+    Given a search in Biosamples returning 45 samples in pages of 10, with cursors from the third page
+    When I search for samples prefetching 3 pages
+    Then I should get all the 45 samples in order, following the next links from the third page
+
+  Scenario: Search samples into a columnar frame (Biosamples)
+    Given a search in Biosamples returning 45 samples in pages of 10
+    When I search for samples as a frame
+    Then I should get a frame with one row per sample, in order
+
+  Scenario Outline: Retrieve samples through a cache (Biosamples)
+    Given a BsdApi with a <cache_type> cache
+    When I retrieve the same accession twice, update it and retrieve it again
+    Then the archive should be requested twice and the cache should report 1 hit and 2 misses
+
+    Examples: Caches
+    | cache_type |
+    | memory     |
+    | sqlite     |
+
+  Scenario: Revalidate expired cached samples with conditional requests (Biosamples)
+    Given a BsdApi with a memory cache that expires its entries immediately
+    When I retrieve the same accession twice, and the archive answers the second time with a 304
+    Then the second request should be conditional and the cached sample should be reused
+
+  Scenario: Stop a concurrent bulk submission at the first failing chunk (Biosamples)
+    Given 30 Biosample filled with content from assets/valid_minimal.json
+    When the samples are submitted in chunks of 5 using 2 workers, and the first chunk fails while the second is being uploaded
+    Then only the first two chunks should have been sent, and the error of the first chunk raised
+
+  Scenario: Reject duplicated samples when submitting with a journal (Biosamples)
+    Given 3 Biosample filled with content from assets/valid_minimal.json
+    When the first and last samples are duplicated and the samples are submitted with a journal given as a path object
+    Then the submission should be rejected before sending any sample, reporting the duplicated positions
+
+  Scenario: Fail a bulk submission without a journal (Biosamples)
+    Given 12 Biosample filled with content from assets/valid_minimal.json
+    When the samples are submitted in chunks of 5 without a journal and the second chunk fails
+    Then the error of the second chunk should be raised, without sending the third chunk nor returning any sample
+
+  Scenario: Retrieve a cached sample after submitting structured data to it (Biosamples)
+    Given a BsdApi with a memory cache
+    When I retrieve a sample and then submit structured data to it
+    Then the sample returned should have the structured data, requested again from the archive
@@ -8,4 +8,24 @@ Feature: Authenticator unit tests
 
     Examples: Webin
     | auth | prefix | pattern |
-    | WebinAuthenticator | WEBIN | ^Bearer [\w-]+\.[\w-]+\.[\w-]+$ |
\ No newline at end of file
+    | WebinAuthenticator | WEBIN | ^Bearer [\w-]+\.[\w-]+\.[\w-]+$ |
+
+  Scenario: Requests share a single pooled session
+    Given a WebinAuthenticator with a mocked session
+    When I send 3 GET requests
+    Then all the requests should go through the same session
+
+  Scenario Outline: Closing the authenticator closes the session
+    Given a WebinAuthenticator with a mocked session
+    When I <action>
+    Then the session should be closed
+
+    Examples:
+    | action                          |
+    | close the authenticator         |
+    | exit a with block using it      |
+
+  Scenario: Concurrent requests with an expired token refresh it only once
+    Given a WebinAuthenticator with a mocked session
+    When 4 threads send a GET request at the same time and their token has expired
+    Then the token should be refreshed once and all the requests should succeed
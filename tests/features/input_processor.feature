@@ -26,6 +26,19 @@ Feature: Input processor unit tests
       | input_processor   | input_file                  |
       | XlsxInputProcessor | assets/valid_minimal.xlsx  |
 
+  Scenario Outline: Chained column transformations
+    Given an instance of <input_processor> loaded with an <input_file>
+    When I chain transformations renaming, deleting non-mapped fields, filling and mapping values
+    Then the transformations should be applied together, warning once per missing field
+
+    Examples: TSV
+      | input_processor   | input_file              |
+      | TsvInputProcessor | assets/valid_minimal.tsv|
+
+    Examples: XLSX
+      | input_processor   | input_file                  |
+      | XlsxInputProcessor | assets/valid_minimal.xlsx  |
+
   Scenario Outline: Integration with Metadata Entities
     Given an instance of <input_processor> loaded with an <input_file>
     When I call the process method providing with a <metadata_entity_class> class
@@ -34,4 +47,74 @@ Feature: Input processor unit tests
     Examples: BioSamples
       | input_processor   | input_file                | metadata_entity_class |
       | TsvInputProcessor | assets/valid_minimal.tsv  | Biosample             |
-      | XlsxInputProcessor| assets/valid_minimal.xlsx | Biosample             |
\ No newline at end of file
+      | XlsxInputProcessor| assets/valid_minimal.xlsx | Biosample             |
+
+  Scenario Outline: Process entities in parallel, aggregating validation errors
+    Given an instance of <input_processor> loaded with an <input_file>
+    When I process <number_of_rows> rows, <number_of_invalid> of them invalid, with <max_workers> processes
+    Then all the validation errors should be raised together, with the index of each invalid row
+
+    Examples: BioSamples
+      | input_processor   | input_file               | number_of_rows | number_of_invalid | max_workers |
+      | TsvInputProcessor | assets/valid_minimal.tsv | 25             | 3                 | 1           |
+      | TsvInputProcessor | assets/valid_minimal.tsv | 25             | 3                 | 2           |
+
+  Scenario: Stream metadata from a TSV file
+    Given a TSV file with 25 rows, loaded in streaming mode with chunks of 4 rows
+    When I iterate over the entities lazily
+    Then the entities should be created in order without loading the whole file
+
+  Scenario: Stream a XLSX file with empty header cells and dates
+    Given a XLSX file with an empty header cell, dates and missing values
+    When I read its records both in read-only mode and loading the whole workbook
+    Then the records should be the same, with the empty header cell named after its position
+
+  Scenario Outline: Stream metadata from several worksheets of a XLSX file
+    Given a XLSX file with 2 worksheets of 10 rows each, loaded in read-only mode with <max_workers> processes
+    When I iterate over the entities lazily
+    Then the entities of both worksheets should be created in order
+
+    Examples:
+      | max_workers |
+      | 1           |
+      | 2           |
+
+  Scenario: Stream selected columns from a Parquet file
+    Given a Parquet file with 25 rows, loaded in streaming mode with chunks of 4 rows and only the name and organism columns
+    When I iterate over the records lazily
+    Then only the name and organism columns should be read, in order
+
+  Scenario: Stream entities from a compressed JSON Lines file
+    Given a gzip-compressed JSON Lines file with 25 entities, renaming the 'name' field with a transformation
+    When I iterate over the entities lazily
+    Then the entities should be loaded in order, transformed, without reading the whole file
+
+  Scenario Outline: Validate the entities of a JSON Lines file on request
+    Given a JSON Lines file with 10 entities, 3 of them without release date
+    When I load them with a JsonlInputProcessor, validating them with <max_workers> processes
+    Then all the validation errors should be raised together, with the index of each invalid entity
+    And iterating over them with validation should fail on the first invalid entity
+    And loading them without validation should return all the entities
+
+    Examples:
+      | max_workers |
+      | 1           |
+      | 2           |
+
+  Scenario Outline: Load metadata from compressed files and streams
+    Given the content of assets/valid_minimal.tsv written into <input> with <compression> compression
+    When I load it with a TsvInputProcessor with <compression> compression and <chunk_size> rows per chunk
+    Then the records should be the same as in assets/valid_minimal.tsv
+
+    Examples:
+      | input           | compression | chunk_size |
+      | input.tsv.gz    | gzip        | 0          |
+      | input.tsv.bz2   | bz2         | 1          |
+      | input.tsv.zst   | zstd        | 0          |
+      | a binary stream | gzip        | 1          |
+      | a text stream   | no          | 0          |
+
+  Scenario: Reject a compression requested for a text stream
+    Given the content of assets/valid_minimal.tsv written into a text stream with no compression
+    When I try to load it with a TsvInputProcessor with gzip compression
+    Then a ValueError should be raised, as text streams can't be decompressed
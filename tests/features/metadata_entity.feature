@@ -40,3 +40,38 @@ Feature: Metadata entity unit tests
     Given a Biosample
     When I add a valid external reference
     Then it should be loaded at the root, under 'external_references'
+
+  Scenario: Biosample - Trusted constructor for archive content
+    Given the content of a sample returned by the archive
+    When I load it with the trusted constructor
+    Then the content should be used as-is, without validation
+
+  Scenario: Biosample - Validate multiple samples at once
+    Given several samples created without validation, some of them invalid
+    When I validate them all at once
+    Then I should get all the errors, grouped by sample index and field
+
+  Scenario: Biosample - Compact memory layout
+    Given several samples created without validation, some of them invalid
+    Then the samples should not hold a per-instance dictionary nor logger
+    And the logger should be set up only once for all the samples of a class
+
+  Scenario: BiosampleFrame - Columnar transformation and validation
+    Given non-nested records loaded into a BiosampleFrame
+    When I transform a whole column and validate the frame
+    Then the errors should be reported by row and the samples converted to Biosamples
+
+  Scenario: Biosample - Flattened view is cached until the sample is modified
+    Given a Biosample
+    When the flatten method is called
+    Then the flattened view should be reused until a value is set or deleted
+
+  Scenario: Biosample - Rows sharing their columns are loaded with a single column plan
+    Given several rows with the same columns, including an undocumented tag
+    When I load them as Biosamples twice, with an input processor
+    Then the undocumented tag should be warned about once per load
+
+  Scenario: Biosample - The column plan follows the rules of Biosample subclasses
+    Given Biosample subclasses with their own root properties and tags, or their own __setitem__
+    When I load the same row into each of them
+    Then each sample should be loaded following the rules of its class
@@ -11,4 +11,65 @@ Feature: Input processor unit tests
 
     Examples: XLSX
       | output_processor  | metadata_entity         | valid_minimal_json | output_file_path | test_file_path |
-      | XlsxOutputProcessor | Biosample  | assets/valid_minimal.json      | output.xlsx       | assets/valid_minimal_test.xlsx |
\ No newline at end of file
+      | XlsxOutputProcessor | Biosample  | assets/valid_minimal.json      | output.xlsx       | assets/valid_minimal_test.xlsx |
+
+  Scenario Outline: Save a BiosampleFrame to source
+    Given an instance of <output_processor> and a BiosampleFrame loaded with the content in <valid_minimal_json>
+    When I save the frame as <output_file_path>
+    Then the output should be equal to <test_file_path>
+
+    Examples:
+      | output_processor    | valid_minimal_json        | output_file_path | test_file_path                 |
+      | TsvOutputProcessor  | assets/valid_minimal.json | output.tsv       | assets/valid_minimal_test.tsv  |
+      | XlsxOutputProcessor | assets/valid_minimal.json | output.xlsx      | assets/valid_minimal_test.xlsx |
+
+
+  Scenario: Stream entities into a TSV file, with columns appearing in later entities
+    Given several Biosamples, the later ones with new fields
+    When I save them with a streaming TsvOutputProcessor as output_streamed.tsv
+    Then the output should be the same as saving them all at once
+
+  Scenario Outline: Files written through a temporary file get the same permissions as files written directly
+    Given several Biosamples, the later ones with new fields
+    When a streaming <output_processor> saves them into <output_file_path>, over a file with <existing_mode> permissions
+    Then the output file should have <expected_mode> permissions
+
+    Examples:
+      | output_processor       | output_file_path        | existing_mode | expected_mode |
+      | TsvOutputProcessor     | output_streamed.tsv     | no            | 644           |
+      | TsvOutputProcessor     | output_streamed.tsv     | 640           | 640           |
+      | XlsxOutputProcessor    | output_streamed.xlsx    | no            | 644           |
+      | ParquetOutputProcessor | output_streamed.parquet | no            | 644           |
+      | JsonlOutputProcessor   | output_streamed.jsonl   | no            | 644           |
+      | JsonlOutputProcessor   | output_streamed.jsonl   | 640           | 640           |
+
+  Scenario: Stream entities into a XLSX file, rolling over to new worksheets
+    Given several Biosamples, the later ones with new fields
+    When I save them with a streaming XlsxOutputProcessor limited to 3 rows per worksheet as output_streamed.xlsx
+    Then each worksheet should have the full header and at most 2 samples
+
+  Scenario: Stream entities with typed values into a XLSX file with a long worksheet name
+    Given several entities with dates and numbers, the later ones with new fields
+    When I save them with a streaming XlsxOutputProcessor on a worksheet named "Metadata of the sample batch 01"
+    Then the values should keep their types and the worksheet names should fit the excel limit
+
+  Scenario: Stream entities into a Parquet file, with columns appearing in later row groups
+    Given several Biosamples, the later ones with new fields
+    When I save them with a streaming ParquetOutputProcessor with row groups of 1 entity as output_streamed.parquet
+    Then reading the Parquet file back should return the flattened entities
+
+  Scenario Outline: Save entities as JSON Lines, keeping all the values of the characteristics
+    Given several Biosamples with characteristics with multiple values
+    When I save them with a JsonlOutputProcessor as <output_file_path>
+    Then loading the file with a JsonlInputProcessor should return the same entities
+
+    Examples:
+      | output_file_path          |
+      | output_streamed.jsonl     |
+      | output_streamed.jsonl.gz  |
+      | output_streamed.jsonl.zst |
+
+  Scenario: Save entities into a compressed stream, as they are received
+    Given several Biosamples, the later ones with new fields
+    When I save them with a streaming TsvOutputProcessor into a gzip-compressed binary stream
+    Then the decompressed stream should be the same as saving them all at once into a file
@@ -1,14 +1,19 @@
 from behave import *
 import os
 import json
+import pathlib
+import re
+import tempfile
+import threading
+import time
 
 import sys
 sys.path.insert(0, "../../")
 
 
 from biobroker.authenticator import WebinAuthenticator
-from biobroker.api import BsdApi
-from biobroker.api.exceptions import StructuredDataError
+from biobroker.api import BsdApi, MemoryCache, SqliteCache
+from biobroker.api.exceptions import StructuredDataError, BiosamplesValidationError, DuplicateJournalEntriesError
 from biobroker.metadata_entity import Biosample
 
 import mock
@@ -118,4 +123,350 @@ def struc_data_invalid_acc(context):
 @then("it should raise an error regarding the accession")
 def struc_data_invalid_acc(context):
     assert "accession: Value provided must match pattern" in context.error.message
-    assert context.error.message.count('\n\t-') == 1, "Only accession error should be raised"
\ No newline at end of file
+    assert context.error.message.count('\n\t-') == 1, "Only accession error should be raised"
+
+def mock_response(status_code, content):
+    response = mock.Mock(status_code=status_code, text=json.dumps(content), headers={})
+    response.json.return_value = content
+    return response
+
+def mock_get_sample(url, *args, **kwargs):
+    accession = url.rsplit('/', 1)[-1]
+    if accession == "SAMEA0":
+        return mock_response(404, {"error": "Not Found", "message": "Sample not found"})
+    with open('assets/accessioned_BsdApi_entity.json', 'r') as f:
+        sample = json.load(f)
+    sample['accession'] = accession
+    return mock_response(200, sample)
+
+@given("a list of accessions with a repeated accession and a missing accession")
+def retrieve_concurrently(context):
+    context.accessions = ["SAMEA3", "SAMEA1", "SAMEA0", "SAMEA3", "SAMEA2"]
+
+@when("the samples are retrieved with the BsdApi using {max_workers:d} workers")
+def retrieve_concurrently(context, max_workers):
+    biosamples_api = context.instances['BsdApi']
+    biosamples_api.max_workers = max_workers
+    with mock.patch.object(biosamples_api.authenticator, 'get', side_effect=mock_get_sample) as mocked_get:
+        context.retrieved_entities = biosamples_api.retrieve(context.accessions)
+        context.requested_urls = [call.args[0] for call in mocked_get.call_args_list]
+
+@then("the samples should be retrieved in the same order as the accessions, requesting each accession once")
+def retrieve_concurrently(context):
+    assert [entity.accession for entity in context.retrieved_entities] == ["SAMEA3", "SAMEA1", "SAMEA3", "SAMEA2"]
+    assert len(context.requested_urls) == len(set(context.accessions))
+    # Each position of a repeated accession can be modified independently
+    context.retrieved_entities[0]['tissue'] = 'liver'
+    assert 'tissue' not in context.retrieved_entities[2]
+
+@then("the missing accession should be reported as a failure, by position")
+def retrieve_concurrently(context):
+    assert list(context.retrieved_entities.failures.keys()) == [2]
+
+@given("the second and fourth samples have the same invalid accession")
+def update_concurrently(context):
+    context.metadata_entity = [Biosample(context.entity_metadata_json) for _ in range(context.length)]
+    context.metadata_entity[1]['accession'] = "NOT_AN_ACCESSION"
+    context.metadata_entity[3]['accession'] = "NOT_AN_ACCESSION"
+
+@when("the samples are updated with the BsdApi using {max_workers:d} workers")
+def update_concurrently(context, max_workers):
+    biosamples_api = context.instances['BsdApi']
+    biosamples_api.max_workers = max_workers
+    with mock.patch.object(biosamples_api.authenticator, 'put',
+                           side_effect=lambda url, payload: mock_response(200, payload)):
+        context.updated_entities = biosamples_api.update(context.metadata_entity)
+
+@then("the valid samples should be updated and each invalid sample reported as a failure, by position")
+def update_concurrently(context):
+    assert len(context.updated_entities) == context.length - 2
+    assert all(entity.accession == "SAMEA131439753" for entity in context.updated_entities)
+    assert list(context.updated_entities.failures.keys()) == [1, 3]
+
+def mock_bulk_submit(url, payload):
+    return mock_response(201, [dict(entity.entity, accession=f"SAMEA{entity.id}") for entity in payload])
+
+@when("the samples are submitted with the BsdApi in chunks of {chunk_size:d} using {max_workers:d} workers")
+def submit_concurrently(context, chunk_size, max_workers):
+    context.metadata_entity = [Biosample(dict(context.entity_metadata_json, name=f"{i}"))
+                               for i in range(context.length)]
+    biosamples_api = context.instances['BsdApi']
+    biosamples_api.max_workers = max_workers
+    with mock.patch.object(biosamples_api.authenticator, 'post', side_effect=mock_bulk_submit) as mocked_post:
+        context.submitted_entities = biosamples_api.submit(context.metadata_entity, chunk_size=chunk_size)
+        context.submitted_chunks = mocked_post.call_count
+
+@then("the submitted samples should be returned in the same order as the input")
+def submit_concurrently(context):
+    assert context.submitted_chunks == 3
+    assert [entity.accession for entity in context.submitted_entities] == [f"SAMEA{i}" for i in range(context.length)]
+
+@when("the samples are submitted in chunks of {chunk_size:d} with a journal and the second chunk fails")
+def submit_journal(context, chunk_size):
+    context.chunk_size = chunk_size
+    context.journal_path = os.path.join(tempfile.mkdtemp(), "journal.sqlite")
+    context.metadata_entity = [Biosample(dict(context.entity_metadata_json, name=f"{i}"))
+                               for i in range(context.length)]
+    biosamples_api = context.instances['BsdApi']
+    biosamples_api.max_workers = 1
+    failing_response = mock_response(400, [{"dataPath": "/characteristics/organism", "errors": ["Invalid"]}])
+    side_effect = [mock_bulk_submit(None, context.metadata_entity[:chunk_size]), failing_response]
+    with mock.patch.object(biosamples_api.authenticator, 'post', side_effect=side_effect):
+        try:
+            biosamples_api.submit(context.metadata_entity, chunk_size=chunk_size, journal=context.journal_path)
+            assert False, "The second chunk should have failed"
+        except BiosamplesValidationError:
+            pass
+
+@when("the samples are submitted again with the same journal")
+def submit_journal(context):
+    biosamples_api = context.instances['BsdApi']
+    with mock.patch.object(biosamples_api.authenticator, 'post', side_effect=mock_bulk_submit) as mocked_post:
+        context.submitted_entities = biosamples_api.submit(context.metadata_entity, chunk_size=context.chunk_size,
+                                                           journal=context.journal_path)
+        context.resubmitted_names = [entity.id for call in mocked_post.call_args_list for entity in call.kwargs['payload']]
+
+@then("only the samples from the failed chunk should be submitted again")
+def submit_journal(context):
+    assert context.resubmitted_names == [f"{i}" for i in range(context.chunk_size, context.length)]
+    assert [entity.accession for entity in context.submitted_entities] == [f"SAMEA{i}" for i in range(context.length)]
+
+def mock_search_page(url, *args, **kwargs):
+    page = int(re.search(r"page=(\d+)", url).group(1))
+    with open('assets/accessioned_BsdApi_entity.json', 'r') as f:
+        sample = json.load(f)
+    first, last = page * 10, min(page * 10 + 10, 45)
+    content = {"page": {"totalElements": 45, "size": 10, "number": page},
+               "_embedded": {"samples": [dict(sample, accession=f"SAMEA{i}") for i in range(first, last)]},
+               "_links": {}}
+    if last < 45:
+        content["_links"]["next"] = {"href": re.sub(r"page=\d+", f"page={page + 1}", url)}
+    return mock_response(200, content)
+
+def mock_cursor_search_page(url, *args, **kwargs):
+    # Pages are only served by number up to the second one: deeper pages are reached with the cursor of the 'next' link
+    cursor = re.search(r"cursor=(\d+)", url)
+    page = int(cursor.group(1)) if cursor else int(re.search(r"page=(\d+)", url).group(1))
+    if not cursor and page > 1:
+        page = 0
+    content = mock_search_page(f"https://www.ebi.ac.uk/biosamples/samples?page={page}").json()
+    if "next" in content["_links"] and page >= 1:
+        content["_links"]["next"]["href"] = f"https://www.ebi.ac.uk/biosamples/samples?cursor={page + 1}"
+    return mock_response(200, content)
+
+@given("a search in Biosamples returning 45 samples in pages of 10")
+def search_lazily(context):
+    context.search_text = "python_test"
+    context.search_page = mock_search_page
+
+@given("a search in Biosamples returning 45 samples in pages of 10, with cursors from the third page")
+def search_cursor(context):
+    context.search_text = "python_test"
+    context.search_page = mock_cursor_search_page
+
+@when("I iterate over the search results with a limit of {limit:d} samples")
+def search_lazily(context, limit):
+    biosamples_api = context.instances['BsdApi']
+    with mock.patch.object(biosamples_api.authenticator, 'get', side_effect=mock_search_page) as mocked_get:
+        context.searched_entities = list(biosamples_api.iter_samples(context.search_text, limit=limit))
+        context.requested_pages = mocked_get.call_count
+
+@then("I should get {number_of_samples:d} samples, requesting only {number_of_pages:d} pages")
+def search_lazily(context, number_of_samples, number_of_pages):
+    assert [entity.accession for entity in context.searched_entities] == [f"SAMEA{i}" for i in range(number_of_samples)]
+    assert context.requested_pages == number_of_pages
+
+@when("I search for samples prefetching {prefetch:d} pages")
+def search_prefetch(context, prefetch):
+    biosamples_api = context.instances['BsdApi']
+    context.requesting_threads = []
+
+    def get_page(url, *args, **kwargs):
+        context.requesting_threads.append(threading.current_thread())
+        return context.search_page(url, *args, **kwargs)
+
+    with mock.patch.object(biosamples_api.authenticator, 'get', side_effect=get_page) as mocked_get:
+        context.searched_entities = biosamples_api.search_samples(context.search_text, prefetch=prefetch)
+        context.requested_urls = [call.args[0] for call in mocked_get.call_args_list]
+
+@then("I should get all the {number_of_samples:d} samples in order, requesting each page once")
+def search_prefetch(context, number_of_samples):
+    assert [entity.accession for entity in context.searched_entities] == [f"SAMEA{i}" for i in range(number_of_samples)]
+    assert len(context.requested_urls) == len(set(context.requested_urls)) == 5
+
+@then("the pages after the first should be requested in the background")
+def search_prefetch(context):
+    main_thread = threading.main_thread()
+    assert context.requesting_threads[0] is main_thread
+    assert all(thread is not main_thread for thread in context.requesting_threads[1:])
+
+@then("I should get all the {number_of_samples:d} samples in order, following the next links from the third page")
+def search_cursor(context, number_of_samples):
+    assert [entity.accession for entity in context.searched_entities] == [f"SAMEA{i}" for i in range(number_of_samples)]
+    assert [url for url in context.requested_urls if "cursor=" in url] == [
+        f"https://www.ebi.ac.uk/biosamples/samples?cursor={page}" for page in (2, 3, 4)]
+
+@when("I search for samples as a frame")
+def search_frame(context):
+    biosamples_api = context.instances['BsdApi']
+    with mock.patch.object(biosamples_api.authenticator, 'get', side_effect=mock_search_page):
+        context.searched_frame = biosamples_api.search_frame(context.search_text)
+
+@then("I should get a frame with one row per sample, in order")
+def search_frame(context):
+    assert len(context.searched_frame) == 45
+    assert list(context.searched_frame['accession']) == [f"SAMEA{i}" for i in range(45)]
+    assert 'organism' in context.searched_frame
+
+@given("a BsdApi with a {cache_type} cache")
+def retrieve_cache(context, cache_type):
+    match cache_type:
+        case "memory":
+            cache = MemoryCache(max_size=10)
+        case "sqlite":
+            cache = SqliteCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"))
+        case _:
+            assert False, f"Please create test for cache type {cache_type}"
+    context.biosamples_api = BsdApi(context.instances['BsdApi'].authenticator, cache=cache)
+
+@when("I retrieve the same accession twice, update it and retrieve it again")
+def retrieve_cache(context):
+    api = context.biosamples_api
+    with mock.patch.object(api.authenticator, 'get', side_effect=mock_get_sample) as mocked_get, \
+            mock.patch.object(api.authenticator, 'put', side_effect=lambda url, payload: mock_response(200, payload)):
+        api.retrieve("SAMEA131439753")
+        sample = api.retrieve("SAMEA131439753")[0]
+        api.update([sample])
+        api.retrieve("SAMEA131439753")
+        context.archive_requests = mocked_get.call_count
+
+@then("the archive should be requested twice and the cache should report 1 hit and 2 misses")
+def retrieve_cache(context):
+    assert context.archive_requests == 2
+    assert context.biosamples_api.cache.stats['hits'] == 1
+    assert context.biosamples_api.cache.stats['misses'] == 2
+
+def mock_get_sample_with_validators(url, headers=None):
+    if headers and headers.get('If-None-Match') == '"v1"':
+        return mock_response(304, None)
+    response = mock_get_sample(url)
+    response.headers = {'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    return response
+
+@given("a BsdApi with a memory cache that expires its entries immediately")
+def retrieve_revalidate(context):
+    context.biosamples_api = BsdApi(context.instances['BsdApi'].authenticator, cache=MemoryCache(ttl=0))
+
+@when("I retrieve the same accession twice, and the archive answers the second time with a 304")
+def retrieve_revalidate(context):
+    api = context.biosamples_api
+    with mock.patch.object(api.authenticator, 'get', side_effect=mock_get_sample_with_validators) as mocked_get:
+        context.retrieved_entities = [api.retrieve("SAMEA131439753")[0] for _ in range(2)]
+        context.request_headers = [call.kwargs.get('headers') for call in mocked_get.call_args_list]
+
+@then("the second request should be conditional and the cached sample should be reused")
+def retrieve_revalidate(context):
+    assert context.request_headers[1] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    assert context.retrieved_entities[0].entity == context.retrieved_entities[1].entity
+    assert context.biosamples_api.cache.stats['revalidations'] == 1
+
+@when("the samples are submitted in chunks of {chunk_size:d} using {max_workers:d} workers, and the first chunk fails "
+      "while the second is being uploaded")
+def submit_cancel(context, chunk_size, max_workers):
+    context.chunk_size = chunk_size
+    context.metadata_entity = [Biosample(dict(context.entity_metadata_json, name=f"{i}"))
+                               for i in range(context.length)]
+    biosamples_api = context.instances['BsdApi']
+    biosamples_api.max_workers = max_workers
+    second_chunk_started = threading.Event()
+
+    def post(url, payload):
+        if payload[0].id == "0":
+            second_chunk_started.wait(timeout=5)
+            return mock_response(400, [{"dataPath": "/characteristics/organism", "errors": ["Invalid"]}])
+        second_chunk_started.set()
+        time.sleep(0.1)
+        return mock_bulk_submit(url, payload)
+
+    with mock.patch.object(biosamples_api.authenticator, 'post', side_effect=post) as mocked_post:
+        try:
+            biosamples_api.submit(context.metadata_entity, chunk_size=chunk_size)
+            context.error = None
+        except BiosamplesValidationError as error:
+            context.error = error
+        context.posted_names = [[entity.id for entity in call.kwargs['payload']] for call in mocked_post.call_args_list]
+
+@then("only the first two chunks should have been sent, and the error of the first chunk raised")
+def submit_cancel(context):
+    assert context.error is not None
+    assert sorted(context.posted_names) == [[f"{i}" for i in range(0, 5)], [f"{i}" for i in range(5, 10)]]
+
+@when("the first and last samples are duplicated and the samples are submitted with a journal given as a path object")
+def submit_duplicates(context):
+    context.metadata_entity = [Biosample(dict(context.entity_metadata_json, name=name)) for name in ("a", "b", "a")]
+    biosamples_api = context.instances['BsdApi']
+    journal_path = pathlib.Path(tempfile.mkdtemp()) / "journal.sqlite"
+    with mock.patch.object(biosamples_api.authenticator, 'post', side_effect=mock_bulk_submit) as mocked_post:
+        try:
+            biosamples_api.submit(context.metadata_entity, journal=journal_path)
+            context.error = None
+        except DuplicateJournalEntriesError as error:
+            context.error = error
+        context.posted_chunks = mocked_post.call_count
+
+@then("the submission should be rejected before sending any sample, reporting the duplicated positions")
+def submit_duplicates(context):
+    assert context.error is not None
+    assert context.error.duplicates == {"a": [0, 2]}
+    assert context.posted_chunks == 0
+
+@when("the samples are submitted in chunks of {chunk_size:d} without a journal and the second chunk fails")
+def submit_failing(context, chunk_size):
+    context.metadata_entity = [Biosample(dict(context.entity_metadata_json, name=f"{i}"))
+                               for i in range(context.length)]
+    biosamples_api = context.instances['BsdApi']
+    biosamples_api.max_workers = 1
+    failing_response = mock_response(400, [{"dataPath": "/characteristics/organism", "errors": ["Invalid"]}])
+    side_effect = [mock_bulk_submit(None, context.metadata_entity[:chunk_size]), failing_response,
+                   mock_bulk_submit(None, context.metadata_entity[2 * chunk_size:])]
+    context.submitted_entities, context.error = None, None
+    with mock.patch.object(biosamples_api.authenticator, 'post', side_effect=side_effect) as mocked_post:
+        try:
+            context.submitted_entities = biosamples_api.submit(context.metadata_entity, chunk_size=chunk_size)
+        except BiosamplesValidationError as error:
+            context.error = error
+        context.posted_names = [[entity.id for entity in call.kwargs['payload']] for call in mocked_post.call_args_list]
+
+@then("the error of the second chunk should be raised, without sending the third chunk nor returning any sample")
+def submit_failing(context):
+    assert isinstance(context.error, BiosamplesValidationError)
+    assert context.submitted_entities is None
+    assert context.posted_names == [[f"{i}" for i in range(0, 5)], [f"{i}" for i in range(5, 10)]]
+
+@when("I retrieve a sample and then submit structured data to it")
+def structured_data_cache(context):
+    api = context.biosamples_api
+    with open('assets/structured_data_invalid_accession.json', 'r') as f:
+        structured_data = dict(json.load(f), accession="SAMEA131439753")
+    archived = {'structured_data': False}
+
+    def get_sample(url, *args, **kwargs):
+        response = mock_get_sample(url)
+        if archived['structured_data']:
+            response.json.return_value['structuredData'] = structured_data['data']
+        return response
+
+    def put_structured_data(url, payload):
+        archived['structured_data'] = True
+        return mock_response(200, payload)
+
+    with mock.patch.object(api.authenticator, 'get', side_effect=get_sample) as mocked_get, \
+            mock.patch.object(api.authenticator, 'put', side_effect=put_structured_data):
+        api.retrieve("SAMEA131439753")
+        context.retrieved_entities = api.submit_structured_data(structured_data)
+        context.archive_requests = mocked_get.call_count
+
+@then("the sample returned should have the structured data, requested again from the archive")
+def structured_data_cache(context):
+    assert context.archive_requests == 2
+    assert 'structuredData' in context.retrieved_entities[0].entity
@@ -1,6 +1,11 @@
 from behave import *
 import os
 import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import mock
 
 import sys
 sys.path.insert(0, "../../")
@@ -30,3 +35,64 @@ def step_impl(context):
 @then("the token should conform to pattern {pattern}")
 def step_impl(context, pattern):
     assert re.match(pattern, context.authenticator_instance.token), "Returned token does not match expected pattern"
+
+def mock_token_response(context):
+    context.tokens_generated += 1
+    return mock.Mock(status_code=200, text=f"token-{context.tokens_generated}")
+
+@given("a WebinAuthenticator with a mocked session")
+def session_pool(context):
+    with mock.patch('biobroker.authenticator.authenticator.requests.Session') as mocked_session_class:
+        context.session = mocked_session_class.return_value
+        context.tokens_generated = 0
+        context.session.post.side_effect = lambda *args, **kwargs: mock_token_response(context)
+        context.session.request.return_value = mock.Mock(status_code=200)
+        context.authenticator_instance = WebinAuthenticator("Webin-1", "password")
+        context.created_sessions = mocked_session_class.call_count
+
+@when("I send {number_of_requests:d} GET requests")
+def session_pool(context, number_of_requests):
+    for index in range(number_of_requests):
+        context.authenticator_instance.get(f"https://example.org/{index}")
+
+@then("all the requests should go through the same session")
+def session_pool(context):
+    assert context.created_sessions == 1
+    assert context.authenticator_instance.session is context.session
+    assert context.session.request.call_count == 3
+
+@when("I close the authenticator")
+def session_close(context):
+    context.authenticator_instance.close()
+
+@when("I exit a with block using it")
+def session_close(context):
+    with context.authenticator_instance as authenticator:
+        authenticator.get("https://example.org")
+    assert context.session.request.call_count == 1
+
+@then("the session should be closed")
+def session_close(context):
+    context.session.close.assert_called_once()
+
+@when("{number_of_threads:d} threads send a GET request at the same time and their token has expired")
+def session_refresh(context, number_of_threads):
+    # All the threads get their 401 before any of them refreshes the token
+    barrier = threading.Barrier(number_of_threads)
+
+    def request(url, method, json, headers):
+        if headers['Authorization'] == "Bearer token-1":
+            barrier.wait(timeout=5)
+            return mock.Mock(status_code=401)
+        return mock.Mock(status_code=200)
+
+    context.session.request.side_effect = request
+    with ThreadPoolExecutor(max_workers=number_of_threads) as executor:
+        context.responses = list(executor.map(context.authenticator_instance.get,
+                                              [f"https://example.org/{index}" for index in range(number_of_threads)]))
+
+@then("the token should be refreshed once and all the requests should succeed")
+def session_refresh(context):
+    assert context.tokens_generated == 2
+    assert context.authenticator_instance.token == "Bearer token-2"
+    assert all(response.status_code == 200 for response in context.responses)
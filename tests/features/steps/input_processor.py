@@ -1,12 +1,27 @@
 from behave import *
 
+import bz2
+import datetime
+import gzip
+import io
 import json
+import mock
+import os
+import tempfile
+import pandas as pd
+from openpyxl import Workbook
+from pandas import read_csv
+import zstandard
 
 import sys
 sys.path.insert(0, "../../")
 
-from biobroker.input_processor import TsvInputProcessor, XlsxInputProcessor, GenericInputProcessor
+from biobroker.input_processor import TsvInputProcessor, XlsxInputProcessor, GenericInputProcessor, ParquetInputProcessor, \
+    JsonlInputProcessor
 from biobroker.metadata_entity import Biosample
+from biobroker.input_processor.exceptions import EntitiesValidationError
+from biobroker.metadata_entity.exceptions import EntityValidationError
+from biobroker.generic.pydantic_model import BiosampleGeneralModel
 
 
 @given('an instance of {input_processor} loaded with an {input_file}')
@@ -32,6 +47,27 @@ def transform(context):
     assert context.input_processor.input_data[0].get('new_field') is not None
 
 
+@when('I chain transformations renaming, deleting non-mapped fields, filling and mapping values')
+def chained_transform(context):
+    context.input_processor.transform({'other_field': 'new_field', 'name': 'name', 'organism': 'organism',
+                                       'missing_field': 'other_missing_field'}, delete_non_mapped_fields=True)
+    context.input_processor.transform(fill_values={'collected_at': 'noon'},
+                                      value_mapping={'organism': {'Homo sapiens': 'Mus musculus'},
+                                                     'missing_field': {'a': 'b'}})
+    with mock.patch.object(context.input_processor.logger, 'warning') as mocked_warning:
+        context.streamed_records = list(context.input_processor.iter_records())
+        context.transformed_records = context.input_processor.input_data
+        context.warnings = [call.args[0] for call in mocked_warning.call_args_list]
+
+@then('the transformations should be applied together, warning once per missing field')
+def chained_transform(context):
+    expected_record = {'name': 'python_test', 'new_field': 'other_values', 'organism': 'Mus musculus',
+                       'collected_at': 'noon'}
+    assert context.streamed_records == context.transformed_records == [expected_record]
+    assert len(context.warnings) == 2
+    assert all("'missing_field'" in warning for warning in context.warnings)
+
+
 # Feature: Integration
 
 @when('I call the process method providing with a {metadata_entity_class} class')
@@ -43,4 +79,225 @@ def process(context, metadata_entity_class):
 def process(context):
     assert isinstance(context.processed_data, context.entity_class)
     assert context.processed_data.id is not None
-    assert context.processed_data.accession is not None
\ No newline at end of file
+    assert context.processed_data.accession is not None
+@when('I process {number_of_rows:d} rows, {number_of_invalid:d} of them invalid, with {max_workers:d} processes')
+def process_parallel(context, number_of_rows, number_of_invalid, max_workers):
+    row = context.input_processor.input_data[0]
+    context.input_processor._input_data = [dict(row, name=f"sample_{index}") for index in range(number_of_rows)]
+    context.invalid_indexes = list(range(0, number_of_rows, number_of_rows // number_of_invalid + 1))
+    for index in context.invalid_indexes:
+        context.input_processor.input_data[index]['release'] = None
+    try:
+        context.input_processor.process(Biosample, max_workers=max_workers, chunk_size=4)
+        context.raised_error = None
+    except EntitiesValidationError as error:
+        context.raised_error = error
+
+@then('all the validation errors should be raised together, with the index of each invalid row')
+def process_parallel(context):
+    assert context.raised_error is not None, "Processing should fail for invalid rows"
+    assert list(context.raised_error.errors) == context.invalid_indexes
+    valid_rows = [row for index, row in enumerate(context.input_processor.input_data)
+                  if index not in context.invalid_indexes]
+    context.input_processor._input_data = valid_rows
+    entities = context.input_processor.process(Biosample, max_workers=2, chunk_size=4)
+    assert [entity.id for entity in entities] == [row['name'] for row in valid_rows]
+
+@given('a TSV file with {number_of_rows:d} rows, loaded in streaming mode with chunks of {chunk_size:d} rows')
+def stream_tsv(context, number_of_rows, chunk_size):
+    with open('assets/valid_minimal.json', 'r') as f:
+        row = json.load(f)
+    context.tsv_path = os.path.join(tempfile.mkdtemp(), 'streamed.tsv')
+    context.expected_names = [f"sample_{index}" for index in range(number_of_rows)]
+    pd.DataFrame([dict(row, name=name) for name in context.expected_names]).to_csv(context.tsv_path, sep='\t',
+                                                                                   index=False)
+    context.input_processor = TsvInputProcessor(context.tsv_path, chunk_size=chunk_size)
+
+@when('I iterate over the entities lazily')
+def stream_tsv(context):
+    with mock.patch('biobroker.input_processor.input_processor.read_csv', wraps=read_csv) as mocked_read_csv:
+        entities = context.input_processor.iter_entities(Biosample)
+        context.first_entity = next(entities)
+        context.entities = [context.first_entity, *entities]
+        context.read_csv_calls = mocked_read_csv.call_args_list
+
+@then('the entities should be created in order without loading the whole file')
+def stream_tsv(context):
+    assert [entity.id for entity in context.entities] == context.expected_names
+    assert context.input_processor._input_data is None
+    assert [call.kwargs.get('chunksize') for call in context.read_csv_calls] == [4]
+    assert context.input_processor.input_data[24]['name'] == "sample_24"
+
+@given('a XLSX file with {number_of_sheets:d} worksheets of {number_of_rows:d} rows each, loaded in read-only mode '
+       'with {max_workers:d} processes')
+def stream_xlsx(context, number_of_sheets, number_of_rows, max_workers):
+    with open('assets/valid_minimal.json', 'r') as f:
+        row = json.load(f)
+    xlsx_path = os.path.join(tempfile.mkdtemp(), 'streamed.xlsx')
+    sheet_names = [f"Sheet{sheet}" for sheet in range(number_of_sheets)]
+    context.expected_names = []
+    with pd.ExcelWriter(xlsx_path, engine='openpyxl') as writer:
+        for sheet_name in sheet_names:
+            names = [f"{sheet_name}_sample_{index}" for index in range(number_of_rows)]
+            pd.DataFrame([dict(row, name=name) for name in names]).to_excel(writer, sheet_name=sheet_name, index=False)
+            context.expected_names.extend(names)
+    context.input_processor = XlsxInputProcessor(xlsx_path, sheet_name=sheet_names, read_only=True,
+                                                 max_workers=max_workers)
+
+@then('the entities of both worksheets should be created in order')
+def stream_xlsx(context):
+    assert [entity.id for entity in context.entities] == context.expected_names
+    assert context.input_processor._input_data is None
+    assert len(context.input_processor.input_data) == len(context.expected_names)
+
+@given('a XLSX file with an empty header cell, dates and missing values')
+def xlsx_empty_header(context):
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = "Sheet1"
+    worksheet.append(['name', None, 'collection date', 'size'])
+    worksheet.append(['sample_0', 'untitled', datetime.datetime(2024, 1, 1), 3])
+    worksheet.append(['sample_1', None, None, None])
+    context.xlsx_path = os.path.join(tempfile.mkdtemp(), 'empty_header.xlsx')
+    workbook.save(context.xlsx_path)
+
+@when('I read its records both in read-only mode and loading the whole workbook')
+def xlsx_empty_header(context):
+    context.streamed_records = list(XlsxInputProcessor(context.xlsx_path, read_only=True).iter_records())
+    context.loaded_records = XlsxInputProcessor(context.xlsx_path).input_data
+
+@then('the records should be the same, with the empty header cell named after its position')
+def xlsx_empty_header(context):
+    assert context.streamed_records == context.loaded_records
+    assert [{key: type(value) for key, value in record.items()} for record in context.streamed_records] == \
+           [{key: type(value) for key, value in record.items()} for record in context.loaded_records]
+    assert list(context.streamed_records[0]) == ['name', 'Unnamed: 1', 'collection date', 'size']
+    assert context.streamed_records[0]['collection date'] == pd.Timestamp('2024-01-01')
+
+@given('a Parquet file with {number_of_rows:d} rows, loaded in streaming mode with chunks of {chunk_size:d} rows and '
+       'only the name and organism columns')
+def stream_parquet(context, number_of_rows, chunk_size):
+    with open('assets/valid_minimal.json', 'r') as f:
+        row = json.load(f)
+    parquet_path = os.path.join(tempfile.mkdtemp(), 'streamed.parquet')
+    context.expected_names = [f"sample_{index}" for index in range(number_of_rows)]
+    pd.DataFrame([dict(row, name=name) for name in context.expected_names]).to_parquet(parquet_path, index=False)
+    context.input_processor = ParquetInputProcessor(parquet_path, columns=['name', 'organism'], chunk_size=chunk_size)
+
+@when('I iterate over the records lazily')
+def stream_parquet(context):
+    context.records = list(context.input_processor.iter_records())
+
+@then('only the name and organism columns should be read, in order')
+def stream_parquet(context):
+    assert context.input_processor._input_data is None
+    assert [record['name'] for record in context.records] == context.expected_names
+    assert all(set(record) == {'name', 'organism'} for record in context.records)
+
+@given("a gzip-compressed JSON Lines file with {number_of_entities:d} entities, renaming the 'name' field with a "
+       "transformation")
+def stream_jsonl(context, number_of_entities):
+    jsonl_path = os.path.join(tempfile.mkdtemp(), 'streamed.jsonl.gz')
+    context.expected_names = [f"sample_{index}" for index in range(number_of_entities)]
+    with gzip.open(jsonl_path, 'wt') as jsonl_file:
+        for index, name in enumerate(context.expected_names):
+            content = {'title': name, 'characteristics': {'organism': [{'text': 'Mus musculus'}]}}
+            if index % 2:
+                content['release'] = None
+            jsonl_file.write(json.dumps(content))
+            jsonl_file.write('\n')
+    context.input_processor = JsonlInputProcessor(jsonl_path)
+    context.input_processor.transform(field_mapping={'title': 'name'})
+
+@then('the entities should be loaded in order, transformed, without reading the whole file')
+def stream_jsonl(context):
+    assert [entity.id for entity in context.entities] == context.expected_names
+    assert context.entities[0]['organism'] == {'text': 'Mus musculus'}
+    # None values are kept; fields missing in some of the entities are not added to them
+    assert ['release' in entity.entity for entity in context.entities] == [bool(index % 2) for index in
+                                                                          range(len(context.entities))]
+    assert all(entity.entity.get('release') is None for entity in context.entities)
+    assert context.input_processor._input_data is None
+
+@given('a JSON Lines file with {number_of_entities:d} entities, {number_of_invalid:d} of them without release date')
+def validate_jsonl(context, number_of_entities, number_of_invalid):
+    jsonl_path = os.path.join(tempfile.mkdtemp(), 'unvalidated.jsonl')
+    context.invalid_indexes = [index * (number_of_entities // number_of_invalid) + 1 for index in range(number_of_invalid)]
+    with open(jsonl_path, 'w') as jsonl_file:
+        for index in range(number_of_entities):
+            content = {'name': f"sample_{index}", 'release': '2024-01-01T00:00:00Z',
+                       'characteristics': {'organism': [{'text': 'Mus musculus'}]}}
+            if index in context.invalid_indexes:
+                content['release'] = None
+            jsonl_file.write(json.dumps(content) + '\n')
+    context.input_processor = JsonlInputProcessor(jsonl_path)
+    context.number_of_entities = number_of_entities
+
+@when('I load them with a JsonlInputProcessor, validating them with {max_workers:d} processes')
+def validate_jsonl(context, max_workers):
+    try:
+        context.input_processor.process(Biosample, max_workers=max_workers, chunk_size=3,
+                                        data_model=BiosampleGeneralModel)
+        context.raised_error = None
+    except EntitiesValidationError as error:
+        context.raised_error = error
+
+@then('all the validation errors should be raised together, with the index of each invalid entity')
+def validate_jsonl(context):
+    assert context.raised_error is not None, "Loading should fail for invalid entities"
+    assert list(context.raised_error.errors) == context.invalid_indexes
+
+@then('iterating over them with validation should fail on the first invalid entity')
+def validate_jsonl(context):
+    entities = context.input_processor.iter_entities(Biosample, data_model=BiosampleGeneralModel)
+    loaded = []
+    try:
+        for entity in entities:
+            loaded.append(entity)
+        raise AssertionError("Iterating should fail for invalid entities")
+    except EntityValidationError:
+        pass
+    assert len(loaded) == context.invalid_indexes[0]
+
+@then('loading them without validation should return all the entities')
+def validate_jsonl(context):
+    entities = context.input_processor.process(Biosample, max_workers=2, chunk_size=3)
+    assert [entity.id for entity in entities] == [f"sample_{index}" for index in range(context.number_of_entities)]
+
+@given('the content of {input_file} written into {target} with {compression} compression')
+def compressed_tsv(context, input_file, target, compression):
+    with open(input_file, 'rb') as f:
+        content = f.read()
+    match target:
+        case 'a text stream':
+            context.input = io.StringIO(content.decode())
+        case 'a binary stream':
+            context.input = io.BytesIO(gzip.compress(content))
+        case _:
+            context.input = os.path.join(tempfile.mkdtemp(), target)
+            opener = {'gzip': gzip.open, 'bz2': bz2.open, 'zstd': zstandard.open}[compression]
+            with opener(context.input, 'wb') as f:
+                f.write(content)
+
+@when('I load it with a TsvInputProcessor with {compression} compression and {chunk_size:d} rows per chunk')
+def compressed_tsv(context, compression, chunk_size):
+    input_processor = TsvInputProcessor(context.input, chunk_size=chunk_size or None,
+                                        compression=None if compression == 'no' else compression)
+    context.records = list(input_processor.iter_records())
+
+@then('the records should be the same as in {input_file}')
+def compressed_tsv(context, input_file):
+    assert context.records == TsvInputProcessor(input_file).input_data
+
+@when('I try to load it with a TsvInputProcessor with {compression} compression')
+def compressed_text_stream(context, compression):
+    try:
+        list(TsvInputProcessor(context.input, compression=compression).iter_records())
+        context.error = None
+    except ValueError as error:
+        context.error = error
+
+@then("a ValueError should be raised, as text streams can't be decompressed")
+def compressed_text_stream(context):
+    assert context.error is not None
+    assert "Text streams can't be gzip-compressed" in str(context.error)
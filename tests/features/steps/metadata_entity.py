@@ -1,10 +1,18 @@
 from behave import *
 import json
+import logging
+import mock
+import os
+import tempfile
+import pandas as pd
 
 import sys
 sys.path.insert(0, "../../")
 
-from biobroker.metadata_entity import Biosample
+from biobroker.input_processor import TsvInputProcessor
+from biobroker.metadata_entity import Biosample, BiosampleFrame
+from biobroker.metadata_entity.exceptions import EntityValidationError
+from biobroker.generic.pydantic_model import BiosampleGeneralModel
 
 @given("all the metadata entity classes")
 def metadata_entity(context):
@@ -75,4 +83,162 @@ def valid_external_reference(context):
 @then("it should be loaded at the root, under 'external_references'")
 def valid_external_reference(context):
     assert isinstance(context.metadata_entity.entity.get('externalReferences'), list)
-    assert context.metadata_entity['externalReferences'] == [{"url": "https://www.ebi.ac.uk/biosamples/docs/references/api/submit#_example_1"}]
\ No newline at end of file
+    assert context.metadata_entity['externalReferences'] == [{"url": "https://www.ebi.ac.uk/biosamples/docs/references/api/submit#_example_1"}]
+@given("the content of a sample returned by the archive")
+def from_archive(context):
+    with open('assets/accessioned_BsdApi_entity.json', 'r') as f:
+        context.archive_content = json.load(f)
+
+@when("I load it with the trusted constructor")
+def from_archive(context):
+    context.metadata_entity = Biosample.from_archive(context.archive_content)
+
+@then("the content should be used as-is, without validation")
+def from_archive(context):
+    assert context.metadata_entity.entity is context.archive_content
+    assert context.metadata_entity.accession == "SAMEA131439753"
+    del context.metadata_entity['release']
+    try:
+        context.metadata_entity.validate(data_model=BiosampleGeneralModel)
+        assert False, "Validation should fail for a sample without release"
+    except EntityValidationError:
+        pass
+
+@given("several samples created without validation, some of them invalid")
+def validate_multiple(context):
+    metadata = [{'name': f'sample_{index}', 'release': '2024-01-01', 'organism': 'Homo sapiens'} for index in range(10)]
+    del metadata[3]['release']
+    del metadata[7]['name']
+    context.samples = [Biosample(content, data_model=None) for content in metadata]
+
+@when("I validate them all at once")
+def validate_multiple(context):
+    context.errors = Biosample.validate_multiple(context.samples, data_model=BiosampleGeneralModel, chunk_size=4)
+
+@then("I should get all the errors, grouped by sample index and field")
+def validate_multiple(context):
+    assert sorted(context.errors) == [3, 7]
+    assert list(context.errors[3]) == ['root']
+    assert "Missing mandatory field 'release'" in context.errors[3]['root'][0]
+    assert "Missing mandatory field 'name'" in context.errors[7]['root'][0]
+    # Valid samples are normalised, the same way 'validate' does
+    assert context.samples[0].entity == Biosample(context.samples[0].entity).entity
+
+@then("the samples should not hold a per-instance dictionary nor logger")
+def compact_layout(context):
+    assert all(not hasattr(sample, '__dict__') for sample in context.samples)
+    assert context.samples[0].logger is context.samples[1].logger
+    context.samples[0]['organism'] = 'Mus musculus'
+    assert context.samples[0]['organism']['text'] == 'Mus musculus'
+
+@then("the logger should be set up only once for all the samples of a class")
+def logger_set_up_once(context):
+    class SampleSubclass(Biosample):
+        __slots__ = ()
+
+    with mock.patch('biobroker.metadata_entity.metadata_entity.set_up_logger',
+                    side_effect=lambda instance, verbose: logging.getLogger('SampleSubclass')) as set_up_logger:
+        samples = [SampleSubclass({'name': f'sample_{index}'}, data_model=None) for index in range(10)]
+        samples += [SampleSubclass.from_archive(sample.entity, verbose=True) for sample in samples]
+        assert all(sample.logger is samples[0].logger for sample in samples)
+    assert set_up_logger.call_count == 1
+
+@given("non-nested records loaded into a BiosampleFrame")
+def biosample_frame(context):
+    records = [{'name': f'sample_{index}', 'release': '2024-01-01', 'organism': 'Homo sapiens', 'size': index}
+               for index in range(5)]
+    records[2]['release'] = None
+    context.frame = BiosampleFrame.from_records(records)
+
+@when("I transform a whole column and validate the frame")
+def biosample_frame(context):
+    context.frame['size||unit'] = 'cm'
+    context.errors = context.frame.validate()
+
+@then("the errors should be reported by row and the samples converted to Biosamples")
+def biosample_frame(context):
+    assert list(context.errors) == [2]
+    assert context.frame['release'][0] == '2024-01-01T00:00:00Z'
+    del context.frame['release']
+    samples = context.frame.to_entities(data_model=None)
+    assert len(samples) == 5
+    assert samples[4]['size'] == {'text': '4', 'unit': 'cm'}
+    assert context.frame.columns == ['name', 'organism', 'size', 'size||unit']
+    # Entity -> frame -> entity round trip; empty relationship fields are not turned into characteristics, while
+    # other empty strings are kept
+    samples[0]['accession'] = 'SAMEA0000001'
+    samples[0]['derived_from'] = 'SAMEA0000002'
+    samples[1]['comment'] = ''
+    round_tripped = BiosampleFrame.from_entities(samples).to_entities(data_model=None)
+    assert [sample.entity for sample in round_tripped] == [sample.entity for sample in samples]
+
+@then("the flattened view should be reused until a value is set or deleted")
+def cached_flatten(context):
+    with mock.patch.object(Biosample, '_flatten', wraps=context.metadata_entity._flatten) as mocked_flatten:
+        context.metadata_entity.flatten()['organism'] = 'modified'
+        assert context.metadata_entity.flatten()['organism'] != 'modified'
+        assert mocked_flatten.call_count == 0
+        context.metadata_entity['collected_at'] = 'noon'
+        assert context.metadata_entity.flatten()['collected_at'] == 'noon'
+        del context.metadata_entity['collected_at']
+        assert 'collected_at' not in context.metadata_entity.flatten()
+        assert mocked_flatten.call_count == 2
+
+@given("several rows with the same columns, including an undocumented tag")
+def column_plan(context):
+    context.rows = [{'name': f'sample_{index}', 'release': '2024-01-01', 'organism': 'Homo sapiens',
+                     'temperature': index, 'temperature||scale': 'celsius'} for index in range(10)]
+
+@when("I load them as Biosamples twice, with an input processor")
+def column_plan(context):
+    tsv_path = os.path.join(tempfile.mkdtemp(), 'column_plan.tsv')
+    pd.DataFrame(context.rows).to_csv(tsv_path, sep='\t', index=False)
+    class UnvalidatedSample(Biosample):
+        __slots__ = ()
+
+        def __init__(self, metadata_content):
+            super().__init__(metadata_content, data_model=None)
+
+    with mock.patch.object(logging.getLogger('UnvalidatedSample'), 'warning') as mocked_warning:
+        context.samples = TsvInputProcessor(tsv_path).process(UnvalidatedSample)
+        context.warnings = [mocked_warning.call_count]
+        context.samples = list(TsvInputProcessor(tsv_path).iter_entities(UnvalidatedSample))
+        context.warnings.append(mocked_warning.call_count)
+
+@then("the undocumented tag should be warned about once per load")
+def column_plan(context):
+    assert context.warnings == [1, 2]
+    assert context.samples[9]['temperature'] == {'text': 9, 'scale': 'celsius'}
+
+@given("Biosample subclasses with their own root properties and tags, or their own __setitem__")
+def subclass_column_plan(context):
+    class RootSample(Biosample):
+        __slots__ = ()
+        ROOT_PROPERTIES = Biosample.ROOT_PROPERTIES | {'project'}
+        VALID_TAGS = Biosample.VALID_TAGS | {'scale'}
+
+    class RecordingSample(Biosample):
+        __slots__ = ()
+        set_fields = []
+
+        def __setitem__(self, key, value):
+            RecordingSample.set_fields.append(key)
+            super().__setitem__(key, value)
+
+    context.sample_classes = (RootSample, RecordingSample)
+    context.row = {'name': 'sample', 'project': 'biobroker', 'temperature': 9, 'temperature||scale': 'celsius'}
+
+@when("I load the same row into each of them")
+def subclass_column_plan(context):
+    with mock.patch.object(logging.getLogger('RootSample'), 'warning') as mocked_warning:
+        context.samples = [sample_class(context.row, data_model=None) for sample_class in context.sample_classes]
+        context.warnings = mocked_warning.call_count
+
+@then("each sample should be loaded following the rules of its class")
+def subclass_column_plan(context):
+    root_sample, recording_sample = context.samples
+    assert root_sample.entity['project'] == 'biobroker'
+    assert root_sample['temperature'] == {'text': 9, 'scale': 'celsius'}
+    assert context.warnings == 0
+    assert type(recording_sample).set_fields == list(context.row)
+    assert recording_sample['project'] == {'text': 'biobroker'}
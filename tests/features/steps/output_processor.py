@@ -1,13 +1,22 @@
 from behave import *
 
+import datetime
+import gzip
+import io
 import json
+import os
+import stat
+import tempfile
 import pandas as pd
+from openpyxl import load_workbook
 
 import sys
 sys.path.insert(0, "../../")
 
-from biobroker.output_processor import TsvOutputProcessor, XlsxOutputProcessor, GenericOutputProcessor
-from biobroker.metadata_entity import Biosample
+from biobroker.input_processor import ParquetInputProcessor, JsonlInputProcessor
+from biobroker.output_processor import TsvOutputProcessor, XlsxOutputProcessor, GenericOutputProcessor, \
+    ParquetOutputProcessor, JsonlOutputProcessor
+from biobroker.metadata_entity import Biosample, BiosampleFrame
 
 
 @given('an instance of {output_processor} and a {metadata_entity} subclass loaded with the content in {valid_minimal_json}')
@@ -17,6 +26,20 @@ def save_method(context, output_processor, metadata_entity, valid_minimal_json):
         context.metadata_entity = eval(metadata_entity)(json.load(f))
 
 
+@given('an instance of {output_processor} and a BiosampleFrame loaded with the content in {valid_minimal_json}')
+def save_frame(context, output_processor, valid_minimal_json):
+    context.output_processor_class = eval(output_processor)
+    with open(valid_minimal_json, 'r') as f:
+        context.frame = BiosampleFrame.from_entities([Biosample(json.load(f))])
+
+
+@when('I save the frame as {output_file_path}')
+def save_frame(context, output_file_path):
+    context.output_file_path = output_file_path
+    context.output_processor = context.output_processor_class(output_file_path)
+    context.output_processor.save(context.frame)
+
+
 @when('I save the entity as {output_file_path}')
 def save_method(context, output_file_path):
     context.output_file_path = output_file_path
@@ -41,4 +64,156 @@ def save_method(context, test_file_path):
     assert len(dataframe_from_test.columns.values) == len(dataframe_from_assets.columns.values), "Different number of columns"
     colnames = set(dataframe_from_test.columns.values) | set(dataframe_from_assets.columns.values)
     differences = [dataframe_from_assets[column].values.sort() == dataframe_from_test[column].values.sort() for column in colnames]
-    assert all(differences), "Values are different"
\ No newline at end of file
+    assert all(differences), "Values are different"
+
+@given('several Biosamples, the later ones with new fields')
+def save_stream(context):
+    with open('assets/valid_minimal.json', 'r') as f:
+        content = json.load(f)
+    context.samples = [Biosample(dict(content, name='sample_0')),
+                       Biosample(dict(content, name='sample_1', tissue='liver')),
+                       Biosample(dict(content, name='sample_2', size=3, **{'size||unit': 'cm'}))]
+
+
+@when('I save them with a streaming TsvOutputProcessor as {output_file_path}')
+def save_stream(context, output_file_path):
+    context.output_file_path = output_file_path
+    TsvOutputProcessor(output_file_path, streaming=True).save(sample for sample in context.samples)
+
+
+@then('the output should be the same as saving them all at once')
+def save_stream(context):
+    expected_path = os.path.join(tempfile.mkdtemp(), 'expected.tsv')
+    TsvOutputProcessor(expected_path).save(context.samples)
+    with open(context.output_file_path, 'r') as streamed_file, open(expected_path, 'r') as expected_file:
+        assert streamed_file.read() == expected_file.read()
+
+
+@when('a streaming {output_processor} saves them into {output_file_path}, over a file with {existing_mode} permissions')
+def save_permissions(context, output_processor, output_file_path, existing_mode):
+    context.output_file_path = output_file_path
+    if os.path.exists(output_file_path):
+        os.remove(output_file_path)
+    if existing_mode != 'no':
+        with open(output_file_path, 'w'):
+            pass
+        os.chmod(output_file_path, int(existing_mode, 8))
+    output_processor_class = eval(output_processor)
+    # JSON Lines are always written as they are received
+    kwargs = {} if output_processor_class is JsonlOutputProcessor else {'streaming': True}
+    previous_umask = os.umask(0o022)
+    try:
+        output_processor_class(output_file_path, **kwargs).save(sample for sample in context.samples)
+    finally:
+        os.umask(previous_umask)
+
+
+@then('the output file should have {expected_mode} permissions')
+def save_permissions(context, expected_mode):
+    assert stat.S_IMODE(os.stat(context.output_file_path).st_mode) == int(expected_mode, 8)
+
+
+@when('I save them with a streaming XlsxOutputProcessor limited to {max_rows:d} rows per worksheet as '
+      '{output_file_path}')
+def save_stream_xlsx(context, max_rows, output_file_path):
+    context.output_file_path = output_file_path
+    output_processor = XlsxOutputProcessor(output_file_path, streaming=True)
+    output_processor.EXCEL_MAX_ROWS = max_rows
+    output_processor.save(sample for sample in context.samples)
+
+
+@then('each worksheet should have the full header and at most {number_of_samples:d} samples')
+def save_stream_xlsx(context, number_of_samples):
+    worksheets = pd.read_excel(context.output_file_path, sheet_name=None, engine='openpyxl')
+    assert list(worksheets) == ['Sheet1', 'Sheet1_2']
+    assert all(len(worksheet) <= number_of_samples for worksheet in worksheets.values())
+    saved = pd.concat(worksheets.values(), ignore_index=True)
+    assert list(saved['name']) == [sample.id for sample in context.samples]
+    assert {'tissue', 'size', 'size||unit'} <= set(saved.columns)
+    assert saved['size||unit'].iloc[2] == 'cm'
+
+
+@given('several entities with dates and numbers, the later ones with new fields')
+def save_stream_xlsx_types(context):
+    class TypedEntity:
+        def __init__(self, record):
+            self.record = record
+
+        def flatten(self):
+            return self.record
+
+    context.records = [{'name': 'sample_0', 'collected': datetime.datetime(2024, 1, 1), 'size': 3},
+                       {'name': 'sample_1', 'collected': datetime.datetime(2024, 1, 2), 'size': 4.5},
+                       {'name': 'sample_2', 'collected': datetime.datetime(2024, 1, 3), 'weight': 10}]
+    context.samples = [TypedEntity(record) for record in context.records]
+
+
+@when('I save them with a streaming XlsxOutputProcessor on a worksheet named "{sheet_name}"')
+def save_stream_xlsx_types(context, sheet_name):
+    context.output_file_path = 'output_streamed.xlsx'
+    output_processor = XlsxOutputProcessor(context.output_file_path, sheet_name=sheet_name, streaming=True)
+    output_processor.EXCEL_MAX_ROWS = 3
+    output_processor.save(sample for sample in context.samples)
+
+
+@then('the values should keep their types and the worksheet names should fit the excel limit')
+def save_stream_xlsx_types(context):
+    workbook = load_workbook(context.output_file_path, read_only=True)
+    assert workbook.sheetnames == ['Metadata of the sample batch 01', 'Metadata of the sample batch _2']
+    columns = ('name', 'collected', 'size', 'weight')
+    # Trailing empty cells are not returned by the read-only iterator
+    rows = [row + (None,) * (len(columns) - len(row)) for worksheet in workbook.worksheets
+            for row in worksheet.iter_rows(min_row=2, values_only=True)]
+    workbook.close()
+    assert rows == [tuple(record.get(column) for column in columns) for record in context.records]
+
+
+@when('I save them with a streaming ParquetOutputProcessor with row groups of {row_group_size:d} entity as '
+      '{output_file_path}')
+def save_stream_parquet(context, row_group_size, output_file_path):
+    context.output_file_path = output_file_path
+    ParquetOutputProcessor(output_file_path, row_group_size=row_group_size,
+                           streaming=True).save(sample for sample in context.samples)
+
+
+@then('reading the Parquet file back should return the flattened entities')
+def save_stream_parquet(context):
+    records = ParquetInputProcessor(context.output_file_path).input_data
+    assert len(records) == len(context.samples)
+    for record, sample in zip(records, context.samples):
+        assert {field: value for field, value in record.items() if value is not None} == sample.flatten()
+
+
+@given('several Biosamples with characteristics with multiple values')
+def save_jsonl(context):
+    content = {'name': 'sample',
+               'release': '2024-01-01T00:00:00Z',
+               'characteristics': {'organism': [{'text': 'Homo sapiens', 'ontologyTerms': ['NCBITaxon_9606']},
+                                                {'text': 'Mus musculus', 'ontologyTerms': ['NCBITaxon_10090']}]}}
+    context.samples = [Biosample.from_archive(dict(content, name=f'sample_{index}')) for index in range(3)]
+
+
+@when('I save them with a JsonlOutputProcessor as {output_file_path}')
+def save_jsonl(context, output_file_path):
+    context.output_file_path = output_file_path
+    JsonlOutputProcessor(output_file_path).save(sample for sample in context.samples)
+
+
+@then('loading the file with a JsonlInputProcessor should return the same entities')
+def save_jsonl(context):
+    samples = JsonlInputProcessor(context.output_file_path).process(Biosample)
+    assert [sample.entity for sample in samples] == [sample.entity for sample in context.samples]
+
+
+@when('I save them with a streaming TsvOutputProcessor into a gzip-compressed binary stream')
+def save_compressed_stream(context):
+    context.stream = io.BytesIO()
+    TsvOutputProcessor(context.stream, streaming=True, compression='gzip').save(sample for sample in context.samples)
+
+
+@then('the decompressed stream should be the same as saving them all at once into a file')
+def save_compressed_stream(context):
+    expected_path = os.path.join(tempfile.mkdtemp(), 'expected.tsv')
+    TsvOutputProcessor(expected_path).save(context.samples)
+    with open(expected_path, 'rb') as expected_file:
+        assert gzip.decompress(context.stream.getvalue()) == expected_file.read()